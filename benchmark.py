@@ -0,0 +1,268 @@
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import main_v8
+
+@contextlib.contextmanager
+def patched_main(**attrs):
+    """Set main_v8 attributes for the duration of a benchmark and restore them afterwards."""
+    saved = {name: getattr(main_v8, name) for name in attrs}
+    try:
+        for name, value in attrs.items():
+            setattr(main_v8, name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(main_v8, name, value)
+
+def generate_log(log_file, num_lines, num_keys, seed):
+    """Write a synthetic operation log with num_lines SET/GET entries over num_keys enrollments."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    grades = ['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D', 'F']
+    with open(log_file, 'w') as f:
+        for i in range(num_lines):
+            timestamp = (start + timedelta(seconds=rng.randrange(30 * 24 * 3600))).strftime('%Y-%m-%d %H:%M:%S')
+            key = rng.randrange(num_keys)
+            student_id = f"SID{key // 50:05d}"
+            course_id = f"CSE{key % 50:03d}"
+            if rng.random() < 0.8:
+                f.write(f"{timestamp} - SET (({student_id}, {course_id}), {rng.choice(grades)})\n")
+            else:
+                f.write(f"{timestamp} - GET ({student_id}, {course_id})\n")
+
+def bench_parallel_parse(num_lines=400000, num_keys=100000, max_workers=None):
+    """Time merge_logs over the same pair of logs with 1..max_workers parse processes."""
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        local_log = os.path.join(tmp_dir, 'local_operations.log')
+        remote_log = os.path.join(tmp_dir, 'remote_operations.log')
+        generate_log(local_log, num_lines, num_keys, seed=1)
+        generate_log(remote_log, num_lines, num_keys, seed=2)
+        # Point the checkpoint file at an empty location so the whole log is read
+        with patched_main(MERGE_LOG=os.path.join(tmp_dir, 'merge_log.txt'),
+                          MERGE_PARSE_CHUNK_BYTES=max(1, os.path.getsize(remote_log) // (4 * max_workers))):
+            print(f"\n=== merge_logs parse scaling ({num_lines} lines per log) ===")
+            baseline = None
+            baseline_time = None
+            for workers in range(1, max_workers + 1):
+                start = time.perf_counter()
+                result = main_v8.merge_logs(local_log, remote_log, 'Local', 'Remote', workers=workers)
+                elapsed = time.perf_counter() - start
+                if baseline is None:
+                    baseline, baseline_time = result, elapsed
+                identical = result == baseline
+                print(f"workers={workers}: {elapsed:.2f}s speedup={baseline_time / elapsed:.2f}x identical={identical}")
+
+class SQLiteCursor:
+    """The part of a mysql.connector cursor used by the apply functions, over SQLite."""
+
+    def __init__(self, conn, latency):
+        self.cursor = conn.cursor()
+        self.latency = latency
+        self.rowcount = -1
+
+    def execute(self, query, params=()):
+        # Model the network round trip of a MySQL server
+        time.sleep(self.latency)
+        self.cursor.execute(query.replace('%s', '?'), params)
+        self.rowcount = self.cursor.rowcount
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+class SQLiteConnection:
+    """MySQL stand-in: an autocommit SQLite connection whose statements each take `latency` seconds extra."""
+
+    def __init__(self, path, latency):
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=60)
+        self.latency = latency
+
+    def cursor(self, **options):
+        # prepared/dictionary options are accepted and ignored: SQLite caches statements itself
+        return SQLiteCursor(self.conn, self.latency)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def start_transaction(self):
+        pass
+
+    @property
+    def in_transaction(self):
+        return False
+
+    def close(self):
+        self.conn.close()
+
+class LatencyCollection:
+    """MongoDB stand-in: a mongomock collection whose calls each take `latency` seconds extra."""
+
+    def __init__(self, collection, latency, lock):
+        self.collection = collection
+        self.latency = latency
+        self.lock = lock
+
+    def find(self, *args, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            return list(self.collection.find(*args, **kwargs))
+
+    def update_one(self, *args, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            return self.collection.update_one(*args, **kwargs)
+
+class LatencyClient:
+    """MongoClient stand-in whose university_db database holds one LatencyCollection."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getitem__(self, name):
+        return {'student_course_grades': self.collection}
+
+    def close(self):
+        pass
+
+def sharded_apply_updates(num_keys, seed):
+    """Return num_keys synthetic merge updates ((student_id, course_id), (grade, timestamp, origin))."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    grades = ['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'D', 'F']
+    return [((f"SID{key // 50:05d}", f"CSE{key % 50:03d}"),
+             (rng.choice(grades), start + timedelta(seconds=rng.randrange(30 * 24 * 3600)), None))
+            for key in range(num_keys)]
+
+def bench_sharded_apply(num_keys=2000, latency=0.002, shard_counts=(1, 2, 4, 8)):
+    """Time apply_updates_sharded for MongoDB and MySQL with 1..N shards against local stand-ins.
+
+    mongomock and SQLite run in-process, so each call sleeps `latency` seconds to model the server round trip
+    that the shards overlap. Each run starts from the same rows and must end in the same state. mongomock evaluates
+    queries in Python, so its MongoDB speedup is capped by the interpreter rather than by the shards.
+    """
+    import mongomock
+    updates = sharded_apply_updates(num_keys, seed=3)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sqlite_path = os.path.join(tmp_dir, 'university_db.sqlite')
+        lock = threading.Lock()
+        collection = mongomock.MongoClient()['university_db']['student_course_grades']
+        stand_in = LatencyCollection(collection, latency, lock)
+        
+        def reset():
+            collection.delete_many({})
+            collection.insert_many([{'student-ID': student_id, 'course-id': course_id, 'grade': 'X', 'version': 0}
+                                    for (student_id, course_id), value in updates])
+            conn = sqlite3.connect(sqlite_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("DROP TABLE IF EXISTS student_course_grades")
+            conn.execute("CREATE TABLE student_course_grades (student_id TEXT, course_id TEXT, grade TEXT, "
+                         "version INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (student_id, course_id))")
+            conn.executemany("INSERT INTO student_course_grades (student_id, course_id, grade) VALUES (?, ?, 'X')",
+                             [key for key, value in updates])
+            conn.commit()
+            conn.close()
+        
+        def snapshot(database_system):
+            if database_system == 'MongoDB':
+                return sorted((doc['student-ID'], doc['course-id'], doc['grade']) for doc in collection.find())
+            conn = sqlite3.connect(sqlite_path)
+            rows = sorted(conn.execute("SELECT student_id, course_id, grade FROM student_course_grades"))
+            conn.close()
+            return rows
+        
+        # The stand-ins live in tmp_dir, so the real clients are put back before it is removed
+        with patched_main(MONGO_LOG=os.path.join(tmp_dir, 'mongo_operations.log'),
+                          MYSQL_LOG=os.path.join(tmp_dir, 'mysql_operations.log'),
+                          ORIGIN_SEQ_FILE=os.path.join(tmp_dir, 'origin_seq.json'),
+                          MongoClient=lambda *args, **kwargs: LatencyClient(stand_in),
+                          get_mysql_connection=lambda: SQLiteConnection(sqlite_path, latency)):
+            for database_system in ('MongoDB', 'MySQL'):
+                print(f"\n=== {database_system} sharded apply ({num_keys} keys, {latency * 1000:.1f}ms per call) ===")
+                baseline = None
+                baseline_time = None
+                for shards in shard_counts:
+                    reset()
+                    start = time.perf_counter()
+                    counts = main_v8.apply_updates_sharded(database_system, iter(updates), shards)
+                    elapsed = time.perf_counter() - start
+                    state = snapshot(database_system)
+                    if baseline is None:
+                        baseline, baseline_time = state, elapsed
+                    print(f"shards={shards}: {elapsed:.2f}s speedup={baseline_time / elapsed:.2f}x "
+                          f"applied={counts[0]} identical={state == baseline}")
+
+def mysql_server_cpu(conn):
+    """Return the total statement CPU time (seconds) MySQL has recorded in performance_schema (MySQL 8.0.28+)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT SUM(SUM_CPU_TIME) FROM performance_schema.events_statements_summary_global_by_event_name")
+    picoseconds, = cursor.fetchone()
+    cursor.close()
+    return float(picoseconds or 0) / 1e12
+
+def bench_mysql_prepared(num_ops=2000):
+    """Compare client and server CPU per MySQL GET + SET with plain and prepared statements (needs the loaded MySQL).
+
+    Each pair runs fetch_row_mysql and set_mysql, so connection checkout and release are measured too. The SETs write
+    back each row's current grade and log to a temporary file; the rows' versions are restored afterwards.
+    """
+    conn = main_v8.get_mysql_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT student_id, course_id, grade, version FROM student_course_grades LIMIT 100")
+        rows = cursor.fetchall()
+        cursor.close()
+        
+        print(f"\n=== MySQL plain vs prepared statements ({num_ops} GET + SET pairs) ===")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for prepared in (False, True):
+                with patched_main(MYSQL_PREPARED=prepared, KEY_FILTER=False,
+                                  MYSQL_LOG=os.path.join(tmp_dir, 'mysql_operations.log'),
+                                  ORIGIN_SEQ_FILE=os.path.join(tmp_dir, 'origin_seq.json')):
+                    server_start = mysql_server_cpu(conn)
+                    client_start = time.process_time()
+                    start = time.perf_counter()
+                    # set_mysql prints one line per call
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        try:
+                            for i in range(num_ops):
+                                student_id, course_id, grade, version = rows[i % len(rows)]
+                                main_v8.fetch_row_mysql(student_id, course_id)
+                                main_v8.set_mysql(student_id, course_id, grade)
+                            elapsed = time.perf_counter() - start
+                            client_cpu = time.process_time() - client_start
+                            server_cpu = mysql_server_cpu(conn) - server_start
+                        finally:
+                            cursor = conn.cursor()
+                            cursor.executemany("""
+                            UPDATE student_course_grades
+                            SET version = %s
+                            WHERE student_id = %s AND course_id = %s
+                            """, [(version, student_id, course_id) for student_id, course_id, grade, version in rows])
+                            cursor.close()
+                    print(f"{'prepared' if prepared else 'plain'}: {elapsed:.2f}s, "
+                          f"client CPU {client_cpu / num_ops * 1e6:.0f}us/op, server CPU {server_cpu / num_ops * 1e6:.0f}us/op")
+    finally:
+        main_v8.close_mysql_connection(conn)
+
+if __name__ == "__main__":
+    bench_parallel_parse()
+    bench_sharded_apply()
+    try:
+        bench_mysql_prepared()
+    except Exception as e:
+        print(f"\nSkipping the prepared statement benchmark: {e}")
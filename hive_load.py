@@ -1,6 +1,7 @@
 import pandas as pd
 from pyhive import hive
 from subprocess import call
+from key_filter import BloomFilter, KEY_FILTER_FILES
 
 # Copy CSV to HDFS
 hdfs_path = '/user/hive/data/student_course_grades.csv'
@@ -17,7 +18,8 @@ CREATE TABLE IF NOT EXISTS student_course_grades (
     course_id STRING,
     roll_no STRING,
     email_id STRING,
-    grade STRING
+    grade STRING,
+    version BIGINT
 )
 ROW FORMAT DELIMITED
 FIELDS TERMINATED BY ','
@@ -35,4 +37,9 @@ conn.commit()
 cursor.close()
 conn.close()
 
+# The load overwrote the table with the CSV, so its keys are the table's keys;
+# record them so lookups of keys that were never loaded can skip Hive
+data = pd.read_csv('student_course_grades.csv')
+BloomFilter.for_keys(zip(data['student-ID'].astype(str), data['course-id'].astype(str))).save(KEY_FILTER_FILES['Hive'])
+
 print("Data loaded into Hive successfully!")
\ No newline at end of file
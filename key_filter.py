@@ -0,0 +1,70 @@
+import hashlib
+import json
+import math
+import os
+
+# Bloom filter of the loaded (student_id, course_id) keys per system, written by the loaders
+KEY_FILTER_FILES = {
+    'MongoDB': 'mongodb_keys.bloom',
+    'MySQL': 'mysql_keys.bloom',
+    'Hive': 'hive_keys.bloom'
+}
+
+# Target false-positive rate: the share of never-loaded keys still sent to the database
+KEY_FILTER_FP_RATE = 0.01
+
+class BloomFilter:
+    """Bloom filter over (student_id, course_id) keys: no false negatives, false positives at about fp_rate."""
+
+    def __init__(self, capacity, fp_rate=KEY_FILTER_FP_RATE):
+        capacity = max(capacity, 1)
+        self.num_bits = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def for_keys(cls, keys, fp_rate=KEY_FILTER_FP_RATE):
+        """Build a filter sized for and holding the given keys."""
+        keys = list(keys)
+        key_filter = cls(len(keys), fp_rate)
+        for key in keys:
+            key_filter.add(key)
+        return key_filter
+
+    def positions(self, key):
+        """Return the bit positions of a key (double hashing over one BLAKE2b digest)."""
+        digest = hashlib.blake2b('|'.join(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        """Add a (student_id, course_id) key."""
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+    def save(self, path):
+        """Write the filter to path atomically: a JSON header line followed by the bit array."""
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            header = {'bits': self.num_bits, 'hashes': self.num_hashes, 'count': self.count}
+            f.write(json.dumps(header).encode() + b'\n')
+            f.write(bytes(self.bits))
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a filter written by save."""
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            key_filter = cls.__new__(cls)
+            key_filter.num_bits = header['bits']
+            key_filter.num_hashes = header['hashes']
+            key_filter.count = header['count']
+            key_filter.bits = bytearray(f.read())
+        return key_filter
@@ -1,12 +1,27 @@
 import pandas as pd
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 import mysql.connector
+from mysql.connector import pooling
 from pyhive import hive
 from datetime import datetime
 import os
 import re
 from dateutil.parser import parse
 import time
+import json
+import heapq
+import itertools
+import shutil
+import tempfile
+import zlib
+import threading
+import fcntl
+import atexit
+import sqlite3
+from collections import OrderedDict, deque
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from key_filter import BloomFilter, KEY_FILTER_FILES
 
 # Log file paths
 MONGO_LOG = 'mongo_operations.log'
@@ -14,42 +29,269 @@ MYSQL_LOG = 'mysql_operations.log'
 HIVE_LOG = 'hive_operations.log'
 MERGE_LOG = 'merge_log.txt'
 
-def log_operation(log_file, operation, student_id, course_id, grade=None):
-    """Log the GET or SET operation with timestamp to the specified log file."""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    if operation == 'GET':
-        log_entry = f"{timestamp} - GET ({student_id}, {course_id})\n"
-    else:  # SET
-        log_entry = f"{timestamp} - SET (({student_id}, {course_id}), {grade})\n"
+# Map database system to log file
+LOG_MAP = {
+    'MongoDB': MONGO_LOG,
+    'MySQL': MYSQL_LOG,
+    'Hive': HIVE_LOG
+}
+
+# Regex for SET operations: YYYY-MM-DD HH:MM:SS - SET ((student_id, course_id), grade)
+SET_PATTERN = r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - SET \(\(([^,]+), ([^)]+)\), ([^\)]+)\)'
+
+# Origin tag appended to SET records: ORIGIN (backend, origin_seq)
+ORIGIN_PATTERN = r' ORIGIN \(([^,]+), (\d+)\)$'
+# Last origin sequence number issued per backend
+ORIGIN_SEQ_FILE = 'origin_seq.json'
+
+# Origin sequence numbers are hybrid logical clocks, stored per key as the row version:
+# (milliseconds << 16) | (logical counter << 2) | backend id. Backend id 0 marks versions derived from untagged log records.
+BACKEND_IDS = {'MongoDB': 1, 'MySQL': 2, 'Hive': 3}
+VERSION_ORIGINS = {0: 'Legacy', 1: 'MongoDB', 2: 'MySQL', 3: 'Hive'}
+# Origin tags below this were issued by the old per-backend counter, not the clock
+MIN_CLOCK_VERSION = 1 << 50
+
+# Parallel log parsing for MERGE: 1 keeps the sequential scan, >1 parses in a process pool
+MERGE_PARSE_WORKERS = 1
+MERGE_PARSE_CHUNK_BYTES = 8 * 1024 * 1024
+
+# Memory-bounded MERGE: spill sorted runs to disk once this many keys are held (None keeps everything in memory)
+MERGE_SPILL_MAX_KEYS = None
+# Maximum number of spilled runs opened at once during the k-way merge
+MERGE_SPILL_FAN_IN = 64
+# Number of merged updates applied per batch
+MERGE_BATCH_SIZE = 1000
+
+# Pipelined MERGE into MongoDB and MySQL: a parser thread streams remote winners to the writer in batches
+MERGE_PIPELINE = False
+# Maximum number of parsed batches waiting for the writer
+MERGE_PIPELINE_QUEUE_SIZE = 4
+
+# Routed GET (ANY . GET): newest version per key in each system's log, read incrementally from a byte offset
+WRITE_INDEX = {system: {'offset': 0, 'versions': {}} for system in LOG_MAP}
+WRITE_INDEX_LOCK = threading.Lock()
+# Once the index holds this many entries across systems, keys every system has at the same version are dropped
+# (they route like never-set keys); the next pass runs when the index has doubled from what is left
+WRITE_INDEX_MAX_KEYS = 100000
+WRITE_INDEX_PRUNE_AT = WRITE_INDEX_MAX_KEYS
+# Recent GET latencies (seconds) kept per system to pick the fastest up-to-date one
+GET_LATENCY_SAMPLES = 100
+GET_LATENCIES = {system: deque(maxlen=GET_LATENCY_SAMPLES) for system in LOG_MAP}
+# Expected GET latency per system until it has samples
+GET_LATENCY_PRIORS = {'MongoDB': 0.005, 'MySQL': 0.005, 'Hive': 2.0}
+
+# Hedged GET (HEDGE . GET): a backup read goes to a second up-to-date system once the first has been running
+# longer than this percentile of its recent latencies
+GET_HEDGE_PERCENTILE = 95
+HEDGE_STATS = {'gets': 0, 'hedged': 0, 'backup_wins': 0}
+HEDGE_STATS_LOCK = threading.Lock()
+HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# Rows fetched per round trip by the student and course scans
+SCAN_BATCH_SIZE = 500
+
+# Keys per query (MongoDB $or, MySQL IN list, Hive staging insert) in get_many
+GET_MANY_CHUNK_SIZE = 1000
+
+# Suffixes for Hive temporary table names, unique per process and call so no other table is shadowed or dropped
+HIVE_TEMP_TABLE_IDS = itertools.count()
+
+# Local SQLite snapshot of the Hive table serving get_hive, kept current from the SET records in HIVE_LOG
+HIVE_SNAPSHOT = False
+HIVE_SNAPSHOT_FILE = 'hive_snapshot.sqlite'
+
+# Write-behind for Hive SETs: SETs are logged at once and held in a pending overlay that GETs consult, then written
+# in one table rewrite once HIVE_WRITE_BEHIND_MAX_PENDING keys are pending, the oldest has waited
+# HIVE_WRITE_BEHIND_MAX_SECONDS, or on HIVE . FLUSH
+HIVE_WRITE_BEHIND = False
+HIVE_WRITE_BEHIND_MAX_PENDING = 100
+HIVE_WRITE_BEHIND_MAX_SECONDS = 30.0
+# Pending {(student_id, course_id): (grade, version)}, last SET per key
+HIVE_PENDING = {}
+HIVE_PENDING_LOCK = threading.Lock()
+HIVE_FLUSH_LOCK = threading.Lock()
+HIVE_FLUSH_TIMER = None
+# Every queued SET is also appended to HIVE_PENDING_FILE. HIVE_FLUSHED_FILE holds its byte offset before which every
+# queued SET is in the table; SETs after it are queued again by the first write-behind SET or flush of the next process,
+# so SETs pending when a process died are not lost
+HIVE_PENDING_FILE = 'hive_pending.jsonl'
+HIVE_FLUSHED_FILE = 'hive_flushed.json'
+HIVE_RECOVERED = False
+
+# Skip database round trips for keys the loaders' Bloom filters (KEY_FILTER_FILES) say were never loaded
+KEY_FILTER = True
+# Loaded filters per system as (file mtime, filter), reloaded when a loader rewrites the file
+KEY_FILTERS = {}
+
+# Read-through GET cache per system: up to GET_CACHE_SIZE rows each (0 disables it),
+# expiring after GET_CACHE_TTL seconds (None keeps them until evicted or written). The TTL bounds
+# how stale a GET can be when another process, such as sync_daemon.py, writes the same rows.
+GET_CACHE_SIZE = 1024
+GET_CACHE_TTL = 5
+GET_CACHES = {system: OrderedDict() for system in LOG_MAP}
+GET_CACHE_STATS = {system: {'hits': 0, 'misses': 0} for system in LOG_MAP}
+GET_CACHE_LOCK = threading.Lock()
+
+# Crash-safe MERGE: write the planned winners to a journal per target and record each applied batch,
+# so an interrupted merge resumes from its last completed batch
+MERGE_JOURNAL = False
+MERGE_JOURNAL_FILE = 'merge_journal_{}.jsonl'
+# Number of journaled updates applied between progress records
+MERGE_JOURNAL_BATCH_SIZE = 10000
+
+# Sharded apply for MongoDB and MySQL: merged updates are split by key hash across this many concurrent connections
+MERGE_APPLY_SHARDS = 1
+# MySQL connections kept open in the shared pool (at least MERGE_APPLY_SHARDS)
+MYSQL_POOL_SIZE = 4
+MYSQL_POOL = None
+MYSQL_POOL_LOCK = threading.Lock()
+# Run the MySQL GET, SET and merge statements as server-side prepared statements, cached per pooled connection
+MYSQL_PREPARED = True
+
+# Fan-out MERGE: number of targets merged concurrently (None runs every target at once)
+MERGE_FANOUT_WORKERS = None
+
+# Serialize read-modify-write of the origin sequence file and appends to the merge log across merge threads
+# (an flock on the origin sequence lock file serializes it across processes)
+ORIGIN_SEQ_LOCK = threading.Lock()
+MERGE_LOG_LOCK = threading.Lock()
+
+# Merkle digests for VERIFY: rows are hashed into DIGEST_BUCKETS leaves, DIGEST_FANOUT children per tree node.
+# Every node's digest is the row count and CRC sum of the rows below it, computed server-side level by level
+DIGEST_BUCKETS = 4096
+DIGEST_FANOUT = 16
+# Bytes per node digest pulled from a system: node number, row count and CRC sum as 64-bit integers
+DIGEST_NODE_BYTES = 24
+
+def load_origin_seqs():
+    """Return the last origin sequence number issued per backend."""
+    if not os.path.exists(ORIGIN_SEQ_FILE):
+        return {}
+    with open(ORIGIN_SEQ_FILE, 'r') as f:
+        return json.load(f)
+
+def save_origin_seqs(seqs):
+    """Persist the per-backend origin sequence numbers atomically."""
+    tmp_file = ORIGIN_SEQ_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(seqs, f)
+    os.replace(tmp_file, ORIGIN_SEQ_FILE)
+
+def next_origin_seq(origin):
+    """Issue and persist the next origin sequence number (hybrid logical clock) for the given backend."""
+    return next_origin_seqs(origin, 1)[0]
+
+def next_origin_seqs(origin, count):
+    """Issue and persist the next count increasing origin sequence numbers for the given backend with one file write.
+
+    The backends share one clock: every number is past the last one issued or observed by any backend, so versions
+    from different backends are ordered by when they were issued.
+    """
+    with ORIGIN_SEQ_LOCK, open(ORIGIN_SEQ_FILE + '.lock', 'a') as lock_file:
+        # Released when the lock file is closed
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        seqs = load_origin_seqs()
+        physical = int(time.time() * 1000) << 16
+        last = max(seqs.values(), default=0)
+        issued = []
+        for i in range(count):
+            # Advance past the last clock value issued or observed by any backend, then stamp the backend id
+            last = max(physical, (last | 3) + 1) | BACKEND_IDS[origin]
+            issued.append(last)
+        seqs[origin] = last
+        save_origin_seqs(seqs)
+        return issued
+
+def observe_origin_seq(origin, version):
+    """Record a version the given backend has applied, so the shared clock, and every backend's later writes, move past it."""
+    with ORIGIN_SEQ_LOCK, open(ORIGIN_SEQ_FILE + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        seqs = load_origin_seqs()
+        if version > seqs.get(origin, 0):
+            seqs[origin] = version
+            save_origin_seqs(seqs)
+
+def version_of(timestamp, origin):
+    """Return the row version for a SET record: its origin clock, or one derived from the timestamp for untagged records."""
+    if origin is not None and origin[1] >= MIN_CLOCK_VERSION:
+        return origin[1]
+    return int(timestamp.timestamp() * 1000) << 16
+
+def version_origin(version):
+    """Return the name of the backend that issued a row version."""
+    return VERSION_ORIGINS[version & 3]
+
+def version_timestamp(version):
+    """Return the wall-clock time encoded in a row version."""
+    return datetime.fromtimestamp((version >> 16) / 1000)
+
+def log_operation(log_file, operation, student_id, course_id, grade=None, origin_seq=None):
+    """Log the GET or SET operation with timestamp to the specified log file.
+
+    SETs are tagged with the backend owning the log as origin and origin_seq, or a fresh origin sequence number.
+    """
+    timestamp = datetime.now()
+    origin = None
+    if operation == 'SET':
+        backend = next(db for db, db_log in LOG_MAP.items() if db_log == log_file)
+        origin = (backend, origin_seq if origin_seq is not None else next_origin_seq(backend))
+    complete_log_operation(log_file, operation, student_id, course_id, timestamp, grade, origin)
+
+def log_get_operations(log_file, keys):
+    """Log a GET for each (student_id, course_id) key to the specified log file in a single write."""
+    timestamp_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     with open(log_file, 'a') as f:
-        f.write(log_entry)
+        f.write(''.join(f"{timestamp_str} - GET ({student_id}, {course_id})\n" for student_id, course_id in keys))
+
+def log_set_operations(log_file, updates, origin_seqs):
+    """Log a SET for each ((student_id, course_id), grade) update, tagged with its origin_seq, in a single write with one timestamp."""
+    timestamp_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    backend = next(db for db, db_log in LOG_MAP.items() if db_log == log_file)
+    with open(log_file, 'a') as f:
+        f.write(''.join(f"{timestamp_str} - SET (({student_id}, {course_id}), {grade}) ORIGIN ({backend}, {origin_seq})\n"
+                        for ((student_id, course_id), grade), origin_seq in zip(updates, origin_seqs)))
 
-def complete_log_operation(log_file, operation, student_id, course_id, timestamp, grade=None):
-    """Log the GET or SET operation with provided timestamp to the specified log file."""
+def complete_log_operation(log_file, operation, student_id, course_id, timestamp, grade=None, origin=None):
+    """Log the GET or SET operation with provided timestamp (and optional (backend, origin_seq) origin tag) to the specified log file."""
     timestamp_str = timestamp.strftime('%Y-%m-%d %H:%M:%S')
     if operation == 'GET':
         log_entry = f"{timestamp_str} - GET ({student_id}, {course_id})\n"
-    else:  # SET
+    elif origin is not None:
+        log_entry = f"{timestamp_str} - SET (({student_id}, {course_id}), {grade}) ORIGIN ({origin[0]}, {origin[1]})\n"
+    else:  # Untagged SET
         log_entry = f"{timestamp_str} - SET (({student_id}, {course_id}), {grade})\n"
     with open(log_file, 'a') as f:
         f.write(log_entry)
 
-def log_merge_operation(local_db, remote_db, local_log_lines, remote_log_lines):
+def log_merge_operation(local_db, remote_db, local_log_lines, remote_log_lines, origin_seq=None):
     """Log the merge operation with timestamp, databases, and both local and remote log line counts."""
+    log_merge_operations([(local_db, remote_db, local_log_lines, remote_log_lines, origin_seq)])
+
+def log_merge_operations(checkpoints):
+    """Log several (local_db, remote_db, local_log_lines, remote_log_lines, origin_seq) merge checkpoints in a single write.
+
+    origin_seq is the remote's origin sequence number that the local system has now seen, or None.
+    """
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_entry = f"{timestamp} - MERGE ({local_db}, {remote_db}, {local_log_lines}, {remote_log_lines})\n"
-    with open(MERGE_LOG, 'a') as f:
-        f.write(log_entry)
+    log_entries = ''
+    for local_db, remote_db, local_log_lines, remote_log_lines, origin_seq in checkpoints:
+        log_entries += f"{timestamp} - MERGE ({local_db}, {remote_db}, {local_log_lines}, {remote_log_lines})"
+        if origin_seq is not None:
+            log_entries += f" ORIGIN ({remote_db}, {origin_seq})"
+        log_entries += '\n'
+    with MERGE_LOG_LOCK, open(MERGE_LOG, 'a') as f:
+        f.write(log_entries)
 
-def get_last_merge_offset(local_db, remote_db):
-    """Retrieve the last merge offsets (lines read) for the given local and remote databases."""
+def read_merge_checkpoint(local_db, remote_db):
+    """Retrieve the last merge offsets (lines read) and remote origin sequence seen for the given local and remote databases."""
     if not os.path.exists(MERGE_LOG):
-        return 0, 0
+        return 0, 0, 0
     
     # Regex to match merge log entries: YYYY-MM-DD HH:MM:SS - MERGE (local_db, remote_db, local_lines, remote_lines)
     merge_pattern = r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - MERGE \(([^,]+), ([^,]+), (\d+), (\d+)\)'
     last_local_offset = 0
     last_remote_offset = 0
+    last_origin_seq = 0
     last_timestamp = None
     
     with open(MERGE_LOG, 'r') as f:
@@ -59,91 +301,565 @@ def get_last_merge_offset(local_db, remote_db):
                 timestamp_str, log_local_db, log_remote_db, local_lines, remote_lines = match.groups()
                 if log_local_db == local_db and log_remote_db == remote_db:
                     timestamp = parse(timestamp_str)
-                    if last_timestamp is None or timestamp > last_timestamp:
+                    # Later lines win on equal timestamps, so merges within the same second are not lost
+                    if last_timestamp is None or timestamp >= last_timestamp:
                         last_timestamp = timestamp
                         last_local_offset = int(local_lines)
                         last_remote_offset = int(remote_lines)
+                        origin_match = re.search(ORIGIN_PATTERN, line.strip())
+                        # Checkpoints written before origin tags keep the previous frontier
+                        if origin_match:
+                            last_origin_seq = int(origin_match.group(2))
+    
+    return last_local_offset, last_remote_offset, last_origin_seq
+
+def get_last_merge_offset(local_db, remote_db):
+    """Retrieve the last merge offsets (lines read) for the given local and remote databases."""
+    local_offset, remote_offset, origin_seq = read_merge_checkpoint(local_db, remote_db)
+    return local_offset, remote_offset
+
+def note_origin_seq(origin_seqs, origin):
+    """Raise the {backend: origin_seq} map of the newest tags read from a log to cover a record's origin tag."""
+    if origin is not None and origin[1] > origin_seqs.get(origin[0], 0):
+        origin_seqs[origin[0]] = origin[1]
+
+def merged_origin_seq(local_db, remote_db, read_seqs):
+    """Return the newest remote_db origin sequence number read so far, recorded on the checkpoint of a merge of
+    remote_db into local_db.
+
+    It only covers remote_db records actually read from its log; merges do not skip records by it.
+    """
+    return max(read_merge_checkpoint(local_db, remote_db)[2], read_seqs.get(remote_db, 0))
+
+def origin_already_seen(origin, local_db):
+    """Return True if a record with the given (backend, origin_seq) tag was written by local_db.
+
+    Records from other origins are never skipped by sequence number: a sequence number is issued before the write
+    and its record appended after it, so with concurrent writers a lower one can reach the log after a higher one
+    was merged. The log offsets and the per-row version check keep those records from being applied twice.
+    """
+    return origin is not None and origin[0] == local_db
+
+def parse_set_line(line):
+    """Parse a SET log line into (timestamp, (student_id, course_id), grade, origin), or return None for other lines.
+
+    origin is the (backend, origin_seq) tag of the record, or None for untagged records.
+    """
+    match = re.match(SET_PATTERN, line)
+    if not match:
+        return None
+    timestamp_str, student_id, course_id, grade = match.groups()
+    origin_match = re.search(ORIGIN_PATTERN, line)
+    origin = (origin_match.group(1), int(origin_match.group(2))) if origin_match else None
+    return parse(timestamp_str), (student_id, course_id), grade, origin
+
+def locate_log_range(log_file, line_offset):
+    """Return the byte range of the lines after line_offset and the total number of lines in the log file."""
+    start_byte = 0
+    total_lines = 0
+    last_byte = b''
+    with open(log_file, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            newlines = block.count(b'\n')
+            if start_byte == 0 and total_lines + newlines >= line_offset and line_offset > 0:
+                # The offset line ends inside this block: find the byte just after it
+                pos = -1
+                for _ in range(line_offset - total_lines):
+                    pos = block.index(b'\n', pos + 1)
+                start_byte = f.tell() - len(block) + pos + 1
+            total_lines += newlines
+            last_byte = block[-1:]
+        end_byte = f.tell()
+    # A trailing line without a newline still counts as a line
+    if last_byte and last_byte != b'\n':
+        total_lines += 1
+    if line_offset >= total_lines:
+        start_byte = end_byte
+    return start_byte, end_byte, total_lines
+
+def split_log_range(log_file, start_byte, end_byte, chunk_bytes):
+    """Split a byte range of a log file into newline-aligned (start, end) chunks of roughly chunk_bytes each."""
+    chunks = []
+    with open(log_file, 'rb') as f:
+        chunk_start = start_byte
+        while chunk_start < end_byte:
+            chunk_end = chunk_start + chunk_bytes
+            if chunk_end >= end_byte:
+                chunk_end = end_byte
+            else:
+                # Extend the chunk to the end of the line it stops in
+                f.seek(chunk_end)
+                f.readline()
+                chunk_end = min(f.tell(), end_byte)
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = chunk_end
+    return chunks
+
+def parse_log_chunk(log_file, start_byte, end_byte):
+    """Parse the SET operations in a byte range of a log file into a latest-per-key (timestamp, grade, origin) map,
+    a SET count and the newest {backend: origin_seq} tags read."""
+    partial = {}
+    set_count = 0
+    origin_seqs = {}
+    with open(log_file, 'rb') as f:
+        f.seek(start_byte)
+        data = f.read(end_byte - start_byte).decode()
+    for line in data.split('\n'):
+        record = parse_set_line(line.strip())
+        if record:
+            timestamp, key, grade, origin = record
+            set_count += 1
+            note_origin_seq(origin_seqs, origin)
+            # Keep the first entry on equal versions, as the sequential scan does
+            if key not in partial or version_of(timestamp, origin) > version_of(partial[key][0], partial[key][2]):
+                partial[key] = (timestamp, grade, origin)
+    return partial, set_count, origin_seqs
+
+def read_log_updates(log_file, offset, executor=None):
+    """Return the latest (timestamp, grade, origin) SET per key after offset, the SET count, the total lines of a log file
+    and the newest {backend: origin_seq} tags read.
+
+    The latest SET is the one with the newest version (version_of); ties keep the record read first.
+    With an executor the unread part of the log is split into chunks that are parsed in parallel
+    and reduced in file order, which gives the same result as the sequential scan.
+    """
+    if executor is None:
+        latest = {}
+        set_count = 0
+        total_lines = 0
+        origin_seqs = {}
+        with open(log_file, 'r') as f:
+            for i, line in enumerate(f, 1):
+                total_lines += 1
+                if i <= offset:
+                    continue  # Skip lines processed in previous merge
+                record = parse_set_line(line.strip())
+                if record:
+                    timestamp, key, grade, origin = record
+                    set_count += 1
+                    note_origin_seq(origin_seqs, origin)
+                    if key not in latest or version_of(timestamp, origin) > version_of(latest[key][0], latest[key][2]):
+                        latest[key] = (timestamp, grade, origin)
+        return latest, set_count, total_lines, origin_seqs
+
+    start_byte, end_byte, total_lines = locate_log_range(log_file, offset)
+    chunks = split_log_range(log_file, start_byte, end_byte, MERGE_PARSE_CHUNK_BYTES)
+    futures = [executor.submit(parse_log_chunk, log_file, chunk_start, chunk_end) for chunk_start, chunk_end in chunks]
+    latest = {}
+    set_count = 0
+    origin_seqs = {}
+    for future in futures:
+        partial, chunk_set_count, chunk_origin_seqs = future.result()
+        set_count += chunk_set_count
+        for origin in chunk_origin_seqs.items():
+            note_origin_seq(origin_seqs, origin)
+        for key, value in partial.items():
+            if key not in latest or version_of(value[0], value[2]) > version_of(latest[key][0], latest[key][2]):
+                latest[key] = value
+    return latest, set_count, total_lines, origin_seqs
+
+def merge_logs(local_log_file, remote_log_file, local_db, remote_db, workers=None):
+    """Parse local and remote log files and return a hashmap of latest SET updates from remote log only.
+
+    With workers > 1 (default MERGE_PARSE_WORKERS) both logs are parsed in a process pool.
+    """
+    result, total_local_lines, remote_totals, remote_seqs = merge_logs_multi(
+        local_log_file, {remote_db: remote_log_file}, local_db, workers)
+    return result, total_local_lines, remote_totals[remote_db]
+
+def merge_logs_multi(local_log_file, remote_logs, local_db, workers=None):
+    """Parse the local log and several remote logs ({remote_db: log_file}) into one hashmap of latest remote SET updates.
+
+    Updates that originated at local_db are dropped.
+
+    The newest version (version_of) wins; remote logs are read in the given order after the local log and ties
+    keep the record read first.
+    Returns the updates, the total local log lines, a {remote_db: total_lines} map and a {remote_db: origin_seq} map
+    of the newest remote_db-origin tag read from each remote log.
+    """
+    latest_updates = {}
+    if workers is None:
+        workers = MERGE_PARSE_WORKERS
+    
+    # Get the last merge offsets for every local-remote pair; the local log is read from the oldest one
+    offsets = {remote_db: get_last_merge_offset(local_db, remote_db) for remote_db in remote_logs}
+    local_offset = min(local for local, remote in offsets.values())
+    
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # Process local log file, skipping lines up to local_offset
+        local_set_count = 0
+        total_local_lines = 0
+        if os.path.exists(local_log_file):
+            local_latest, local_set_count, total_local_lines, local_seqs = read_log_updates(local_log_file, local_offset, executor)
+            # Store with source 'local'
+            for key, (timestamp, grade, origin) in local_latest.items():
+                latest_updates[key] = (timestamp, grade, 'local', origin)
+        else:
+            print(f"Warning: Local log file {local_log_file} does not exist.")
+        print(f"Debug: Found {local_set_count} SET operations in local log ({local_log_file}) after offset {local_offset}")
+        
+        # Process each remote log file, skipping lines up to its remote offset
+        remote_totals = {}
+        remote_seqs = {}
+        for remote_db, remote_log_file in remote_logs.items():
+            remote_offset = offsets[remote_db][1]
+            remote_set_count = 0
+            remote_totals[remote_db] = 0
+            if os.path.exists(remote_log_file):
+                remote_latest, remote_set_count, remote_totals[remote_db], origin_seqs = read_log_updates(
+                    remote_log_file, remote_offset, executor)
+                remote_seqs[remote_db] = origin_seqs.get(remote_db, 0)
+                # Store with the remote source if newer or no existing entry
+                for key, (timestamp, grade, origin) in remote_latest.items():
+                    if key not in latest_updates or version_of(timestamp, origin) > version_of(latest_updates[key][0], latest_updates[key][3]):
+                        latest_updates[key] = (timestamp, grade, remote_db, origin)
+            else:
+                print(f"Warning: Remote log file {remote_log_file} does not exist.")
+            print(f"Debug: Found {remote_set_count} SET operations in remote log ({remote_log_file}) after offset {remote_offset}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    # Convert to final hashmap: (student_id, course_id) -> (grade, timestamp, origin), only for remote updates
+    # that did not originate at local_db
+    result = {}
+    seen_count = 0
+    for key, (timestamp, grade, source, origin) in latest_updates.items():
+        if source == 'local':
+            continue
+        if origin_already_seen(origin, local_db):
+            seen_count += 1
+            continue
+        result[key] = (grade, timestamp, origin)
+    
+    print(f"Debug: Skipped {seen_count} remote updates that originated at {local_db}")
+    print(f"Debug: Merged {len(result)} remote updates")
     
-    return last_local_offset, last_remote_offset
+    return result, total_local_lines, remote_totals, remote_seqs
+
+def write_spill_run(run_dir, records):
+    """Write key-sorted (key, timestamp, seq, grade, source, origin) records to a new run file and return its path."""
+    fd, path = tempfile.mkstemp(dir=run_dir, suffix='.run')
+    with os.fdopen(fd, 'w') as f:
+        for key, timestamp, seq, grade, source, origin in records:
+            f.write(json.dumps([key[0], key[1], timestamp.isoformat(sep=' '), seq, grade, source, origin]) + '\n')
+    return path
+
+def sorted_run(latest_updates):
+    """Return the in-memory latest-updates map as key-sorted (key, timestamp, seq, grade, source, origin) records."""
+    return ((key,) + latest_updates[key] for key in sorted(latest_updates))
+
+def read_spill_run(path):
+    """Yield (key, timestamp, seq, grade, source, origin) records from a run file in key order."""
+    with open(path, 'r') as f:
+        for line in f:
+            student_id, course_id, timestamp_str, seq, grade, source, origin = json.loads(line)
+            origin = tuple(origin) if origin is not None else None
+            yield (student_id, course_id), datetime.fromisoformat(timestamp_str), seq, grade, source, origin
+
+def reduce_sorted_runs(runs):
+    """K-way merge key-sorted runs, yielding one (key, timestamp, seq, grade, source, origin) winner per key.
+
+    The newest version (version_of) wins; ties go to the record read first (lowest seq), matching merge_logs.
+    """
+    current_key = None
+    winner = None
+    for record in heapq.merge(*runs, key=lambda record: record[0]):
+        key, timestamp, seq = record[:3]
+        if key != current_key:
+            if winner is not None:
+                yield (current_key,) + winner
+            current_key = key
+            winner = record[1:]
+        else:
+            version, winner_version = version_of(timestamp, record[5]), version_of(winner[0], winner[4])
+            if version > winner_version or (version == winner_version and seq < winner[1]):
+                winner = record[1:]
+    if winner is not None:
+        yield (current_key,) + winner
+
+def compact_spill_runs(run_dir, run_paths):
+    """Merge groups of MERGE_SPILL_FAN_IN runs into single runs until few enough remain to open at once."""
+    while len(run_paths) > MERGE_SPILL_FAN_IN:
+        group, run_paths = run_paths[:MERGE_SPILL_FAN_IN], run_paths[MERGE_SPILL_FAN_IN:]
+        path = write_spill_run(run_dir, reduce_sorted_runs([read_spill_run(p) for p in group]))
+        for p in group:
+            os.remove(p)
+        run_paths.append(path)
+    return run_paths
+
+def merge_spill_runs(run_dir, run_paths, latest_updates, local_db):
+    """Stream the remote LWW winners that did not originate at local_db from the spilled runs and the in-memory tail.
+
+    The run directory is removed once the stream is exhausted or closed.
+    """
+    try:
+        run_paths = compact_spill_runs(run_dir, run_paths)
+        runs = [read_spill_run(path) for path in run_paths]
+        runs.append(sorted_run(latest_updates))
+        for key, timestamp, seq, grade, source, origin in reduce_sorted_runs(runs):
+            if source != 'local' and not origin_already_seen(origin, local_db):
+                yield key, (grade, timestamp, origin)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+def merge_logs_external(local_log_file, remote_logs, local_db, max_keys):
+    """Memory-bounded merge_logs_multi: spill sorted runs to disk whenever the map passes max_keys entries.
 
-def merge_logs(local_log_file, remote_log_file, local_db, remote_db):
-    """Parse local and remote log files and return a hashmap of latest SET updates from remote log only."""
+    Returns a stream of ((student_id, course_id), (grade, timestamp, origin)) remote winners in key order,
+    plus the total local log lines, a {remote_db: total_lines} map and a {remote_db: origin_seq} map of the newest
+    remote_db-origin tag read from each remote log.
+    """
     latest_updates = {}
-    local_set_count = 0
-    remote_set_count = 0
+    run_paths = []
+    run_dir = tempfile.mkdtemp(prefix='merge_spill_')
+    seq = 0
     
-    # Get the last merge offsets for this local-remote pair
-    local_offset, remote_offset = get_last_merge_offset(local_db, remote_db)
+    # Get the last merge offsets for every local-remote pair; the local log is read from the oldest one
+    offsets = {remote_db: get_last_merge_offset(local_db, remote_db) for remote_db in remote_logs}
+    local_offset = min(local for local, remote in offsets.values())
+    log_sources = [('local', 'Local', local_log_file, local_offset)]
+    log_sources += [(remote_db, 'Remote', log_file, offsets[remote_db][1]) for remote_db, log_file in remote_logs.items()]
     
-    # Regex for SET operations: YYYY-MM-DD HH:MM:SS - SET ((student_id, course_id), grade)
-    set_pattern = r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - SET \(\(([^,]+), ([^)]+)\), ([^\)]+)\)'
+    total_lines = {}
+    remote_seqs = {}
+    try:
+        for source, label, log_file, offset in log_sources:
+            set_count = 0
+            total_lines[source] = 0
+            origin_seqs = {}
+            if not os.path.exists(log_file):
+                print(f"Warning: {label} log file {log_file} does not exist.")
+                continue
+            with open(log_file, 'r') as f:
+                for i, line in enumerate(f, 1):
+                    total_lines[source] += 1
+                    if i <= offset:
+                        continue  # Skip lines processed in previous merge
+                    record = parse_set_line(line.strip())
+                    if record:
+                        timestamp, key, grade, origin = record
+                        set_count += 1
+                        seq += 1
+                        note_origin_seq(origin_seqs, origin)
+                        if key not in latest_updates or version_of(timestamp, origin) > version_of(latest_updates[key][0], latest_updates[key][4]):
+                            latest_updates[key] = (timestamp, seq, grade, source, origin)
+                        if len(latest_updates) >= max_keys:
+                            run_paths.append(write_spill_run(run_dir, sorted_run(latest_updates)))
+                            latest_updates = {}
+            if source != 'local':
+                remote_seqs[source] = origin_seqs.get(source, 0)
+            print(f"Debug: Found {set_count} SET operations in {label.lower()} log ({log_file}) after offset {offset}")
+    except Exception:
+        shutil.rmtree(run_dir, ignore_errors=True)
+        raise
     
-    # Process local log file, skipping lines up to local_offset
-    total_local_lines = 0
-    if os.path.exists(local_log_file):
-        with open(local_log_file, 'r') as f:
-            for i, line in enumerate(f, 1):
-                total_local_lines += 1
-                if i <= local_offset:
-                    continue  # Skip lines processed in previous merge
-                match = re.match(set_pattern, line.strip())
-                if match:
-                    timestamp_str, student_id, course_id, grade = match.groups()
-                    timestamp = parse(timestamp_str)
-                    key = (student_id, course_id)
-                    local_set_count += 1
-                    
-                    # Store with source 'local'
-                    if key not in latest_updates or timestamp > latest_updates[key][0]:
-                        latest_updates[key] = (timestamp, grade, 'local')
-    else:
-        print(f"Warning: Local log file {local_log_file} does not exist.")
+    print(f"Debug: Spilled {len(run_paths)} sorted runs to {run_dir}")
     
-    # Process remote log file, skipping lines up to remote_offset
-    total_remote_lines = 0
-    if os.path.exists(remote_log_file):
-        with open(remote_log_file, 'r') as f:
-            for i, line in enumerate(f, 1):
-                total_remote_lines += 1
-                if i <= remote_offset:
-                    continue  # Skip lines processed in previous merge
-                match = re.match(set_pattern, line.strip())
-                if match:
-                    timestamp_str, student_id, course_id, grade = match.groups()
-                    timestamp = parse(timestamp_str)
-                    key = (student_id, course_id)
-                    remote_set_count += 1
-                    
-                    # Store with source 'remote' if newer or no existing entry
-                    if key not in latest_updates or timestamp > latest_updates[key][0]:
-                        latest_updates[key] = (timestamp, grade, 'remote')
+    total_local_lines = total_lines.pop('local')
+    return merge_spill_runs(run_dir, run_paths, latest_updates, local_db), total_local_lines, total_lines, remote_seqs
+
+def load_merge_updates(local_db, remote_dbs):
+    """Return an iterator of remote winners ((student_id, course_id), (grade, timestamp, origin)), or None if there are none,
+    plus the merge checkpoints to log once they are applied.
+
+    Uses merge_logs_external when MERGE_SPILL_MAX_KEYS is set, so peak memory is set by configuration,
+    and pipeline_merge_updates for MongoDB and MySQL when MERGE_PIPELINE is set, so parsing overlaps the writes.
+    """
+    remote_logs = {remote_db: LOG_MAP[remote_db] for remote_db in remote_dbs}
+    if MERGE_PIPELINE and local_db in ('MongoDB', 'MySQL'):
+        # The parser thread fills the checkpoints once it has read the logs
+        updates, checkpoints = pipeline_merge_updates(local_db, remote_dbs)
     else:
-        print(f"Warning: Remote log file {remote_log_file} does not exist.")
+        if MERGE_SPILL_MAX_KEYS:
+            updates, total_local_lines, remote_totals, remote_seqs = merge_logs_external(
+                LOG_MAP[local_db], remote_logs, local_db, MERGE_SPILL_MAX_KEYS)
+        else:
+            updates, total_local_lines, remote_totals, remote_seqs = merge_logs_multi(LOG_MAP[local_db], remote_logs, local_db)
+            updates = iter(updates.items())
+        checkpoints = [(local_db, remote_db, total_local_lines, remote_totals[remote_db],
+                        merged_origin_seq(local_db, remote_db, remote_seqs))
+                       for remote_db in remote_dbs]
     
-    # Convert to final hashmap: (student_id, course_id) -> (grade, timestamp), only for remote updates
-    result = {key: (grade, timestamp) for key, (timestamp, grade, source) in latest_updates.items() if source == 'remote'}
+    # With the pipeline this waits for the first batch, or for the parser to finish and fill the checkpoints
+    first = next(updates, None)
+    if first is None:
+        return None, checkpoints
+    return itertools.chain([first], updates), checkpoints
+
+def produce_merge_batches(local_db, remote_dbs, batch_queue, checkpoints):
+    """Parse the logs for a pipelined merge and put batches of remote winners on batch_queue, then None.
+
+    The local log is read first, since a remote record must lose to any newer local one. The remote logs are
+    then streamed: every MERGE_BATCH_SIZE distinct keys resolved so far are handed to the writer as one batch.
+    A key seen again in a later batch is written again; the version check in the writer keeps the newest.
+    The checkpoints list is filled once the logs are read; an exception is passed to the writer instead.
+    """
+    try:
+        offsets = {remote_db: get_last_merge_offset(local_db, remote_db) for remote_db in remote_dbs}
+        local_offset = min(local for local, remote in offsets.values())
+        local_log_file = LOG_MAP[local_db]
+        local_latest, local_set_count, total_local_lines = {}, 0, 0
+        if os.path.exists(local_log_file):
+            local_latest, local_set_count, total_local_lines, local_seqs = read_log_updates(local_log_file, local_offset)
+        else:
+            print(f"Warning: Local log file {local_log_file} does not exist.")
+        print(f"Debug: Found {local_set_count} SET operations in local log ({local_log_file}) after offset {local_offset}")
+        
+        pending = {}
+        remote_totals = {}
+        remote_seqs = {}
+        seen_count = 0
+        for remote_db in remote_dbs:
+            remote_log_file = LOG_MAP[remote_db]
+            remote_offset = offsets[remote_db][1]
+            remote_set_count = 0
+            remote_totals[remote_db] = 0
+            origin_seqs = {}
+            if not os.path.exists(remote_log_file):
+                print(f"Warning: Remote log file {remote_log_file} does not exist.")
+                continue
+            with open(remote_log_file, 'r') as f:
+                for i, line in enumerate(f, 1):
+                    remote_totals[remote_db] += 1
+                    if i <= remote_offset:
+                        continue  # Skip lines processed in previous merge
+                    record = parse_set_line(line.strip())
+                    if not record:
+                        continue
+                    timestamp, key, grade, origin = record
+                    remote_set_count += 1
+                    note_origin_seq(origin_seqs, origin)
+                    version = version_of(timestamp, origin)
+                    # Local records win ties, earlier remote records win ties among themselves
+                    if key in local_latest and version_of(local_latest[key][0], local_latest[key][2]) >= version:
+                        continue
+                    if origin_already_seen(origin, local_db):
+                        seen_count += 1
+                        continue
+                    if key in pending and version_of(pending[key][1], pending[key][2]) >= version:
+                        continue
+                    pending[key] = (grade, timestamp, origin)
+                    if len(pending) >= MERGE_BATCH_SIZE:
+                        batch_queue.put(list(pending.items()))
+                        pending = {}
+            remote_seqs[remote_db] = origin_seqs.get(remote_db, 0)
+            print(f"Debug: Found {remote_set_count} SET operations in remote log ({remote_log_file}) after offset {remote_offset}")
+        if pending:
+            batch_queue.put(list(pending.items()))
+        print(f"Debug: Skipped {seen_count} remote updates that originated at {local_db}")
+        
+        checkpoints.extend((local_db, remote_db, total_local_lines, remote_totals[remote_db],
+                            merged_origin_seq(local_db, remote_db, remote_seqs))
+                           for remote_db in remote_dbs)
+        batch_queue.put(None)
+    except Exception as e:
+        batch_queue.put(e)
+
+def pipeline_merge_updates(local_db, remote_dbs):
+    """Start a parser thread for a pipelined merge and return an iterator of its remote winners, plus the
+    checkpoints list it fills once the logs are read.
+
+    At most MERGE_PIPELINE_QUEUE_SIZE batches wait in the queue, so a slow writer holds the parser back.
+    """
+    batch_queue = queue.Queue(maxsize=MERGE_PIPELINE_QUEUE_SIZE)
+    checkpoints = []
+    producer = threading.Thread(target=produce_merge_batches,
+                                args=(local_db, remote_dbs, batch_queue, checkpoints), daemon=True)
+    producer.start()
     
-    # Debug output
-    print(f"Debug: Found {local_set_count} SET operations in local log ({local_log_file}) after offset {local_offset}")
-    print(f"Debug: Found {remote_set_count} SET operations in remote log ({remote_log_file}) after offset {remote_offset}")
-    print(f"Debug: Merged {len(result)} remote updates")
+    def drain():
+        while True:
+            batch = batch_queue.get()
+            if batch is None:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield from batch
     
-    return result, total_local_lines, total_remote_lines
+    return drain(), checkpoints
+
+def batched(iterable, size):
+    """Yield lists of up to size items from iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def cache_lookup(system, key):
+    """Return (True, row) for an unexpired cached GET result of the given system, else (False, None); counts hits and misses."""
+    with GET_CACHE_LOCK:
+        cache = GET_CACHES[system]
+        entry = cache.get(key)
+        if entry is not None and (GET_CACHE_TTL is None or time.monotonic() - entry[0] < GET_CACHE_TTL):
+            cache.move_to_end(key)
+            GET_CACHE_STATS[system]['hits'] += 1
+            return True, dict(entry[1])
+        if entry is not None:
+            del cache[key]
+        GET_CACHE_STATS[system]['misses'] += 1
+        return False, None
+
+def cache_store(system, key, row):
+    """Cache a GET result of the given system, evicting the least recently used rows beyond GET_CACHE_SIZE."""
+    if GET_CACHE_SIZE <= 0:
+        return
+    with GET_CACHE_LOCK:
+        cache = GET_CACHES[system]
+        cache[key] = (time.monotonic(), dict(row))
+        cache.move_to_end(key)
+        while len(cache) > GET_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def cache_invalidate(system, keys):
+    """Drop the cached GET results of the given system for keys that were just written."""
+    with GET_CACHE_LOCK:
+        cache = GET_CACHES[system]
+        for key in keys:
+            cache.pop(key, None)
+
+def get_cache_stats():
+    """Return {system: {'hits', 'misses', 'size'}} for the GET caches."""
+    with GET_CACHE_LOCK:
+        return {system: dict(GET_CACHE_STATS[system], size=len(GET_CACHES[system])) for system in GET_CACHES}
+
+def key_may_exist(system, key):
+    """Return False if the system's key filter shows the (student_id, course_id) key was never loaded, else True.
+
+    Without KEY_FILTER or a filter file written by the loader every key may exist.
+    """
+    if not KEY_FILTER or not os.path.exists(KEY_FILTER_FILES[system]):
+        return True
+    mtime = os.path.getmtime(KEY_FILTER_FILES[system])
+    if system not in KEY_FILTERS or KEY_FILTERS[system][0] != mtime:
+        KEY_FILTERS[system] = (mtime, BloomFilter.load(KEY_FILTER_FILES[system]))
+    return key in KEY_FILTERS[system][1]
+
+# Bookkeeping fields (row version and digest CRCs) left out of the MongoDB rows that GETs and scans return
+MONGO_ROW_PROJECTION = {'_id': 0, 'version': 0, 'key_crc': 0, 'row_crc': 0}
 
 def get_mongo(student_id, course_id):
-    """Retrieve a row from MongoDB based on student-ID and course-id."""
+    """Retrieve a row from MongoDB based on student-ID and course-id. Served from the GET cache when possible."""
+    hit, result = cache_lookup('MongoDB', (student_id, course_id))
+    if hit:
+        print("MongoDB Result:", result)
+        log_operation(MONGO_LOG, 'GET', student_id, course_id)
+        return result
+    
+    if not key_may_exist('MongoDB', (student_id, course_id)):
+        print(f"No record found in MongoDB for student-ID: {student_id}, course-id: {course_id}")
+        log_operation(MONGO_LOG, 'GET', student_id, course_id)
+        return None
+    
     try:
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['university_db']
-        collection = db['student_course_grades']
-        
-        query = {'student-ID': student_id, 'course-id': course_id}
-        result = collection.find_one(query)
+        result = fetch_row_mongo(student_id, course_id)
         
         if result:
-            # Remove MongoDB's _id field for cleaner output
-            result.pop('_id', None)
             print("MongoDB Result:", result)
+            cache_store('MongoDB', (student_id, course_id), result)
         else:
             print(f"No record found in MongoDB for student-ID: {student_id}, course-id: {course_id}")
         
@@ -153,26 +869,84 @@ def get_mongo(student_id, course_id):
     except Exception as e:
         print(f"MongoDB Error: {e}")
         return None
+
+def fetch_row_mongo(student_id, course_id):
+    """Return the MongoDB row for student-ID and course-id, or None, without the cache, printing or logging."""
+    client = MongoClient('mongodb://localhost:27017/')
+    try:
+        db = client['university_db']
+        collection = db['student_course_grades']
+        
+        query = {'student-ID': student_id, 'course-id': course_id}
+        return collection.find_one(query, MONGO_ROW_PROJECTION)
+    finally:
+        client.close()
+
+def get_many_mongo(keys):
+    """Return {(student_id, course_id): row} for the given keys found in MongoDB, one $or query per GET_MANY_CHUNK_SIZE keys."""
+    client = MongoClient('mongodb://localhost:27017/')
+    try:
+        db = client['university_db']
+        collection = db['student_course_grades']
+        
+        rows = {}
+        for chunk in batched(keys, GET_MANY_CHUNK_SIZE):
+            query = {'$or': [{'student-ID': student_id, 'course-id': course_id} for student_id, course_id in chunk]}
+            for doc in collection.find(query, MONGO_ROW_PROJECTION):
+                rows[(doc['student-ID'], doc['course-id'])] = doc
+        return rows
+    finally:
+        client.close()
+
+def set_many_mongo(updates):
+    """Write {(student_id, course_id): (grade, version)} to MongoDB and return the set of keys that matched a row.
+
+    Per GET_MANY_CHUNK_SIZE keys, one $or query finds the existing rows and one unordered bulk_write updates them.
+    """
+    client = MongoClient('mongodb://localhost:27017/')
+    try:
+        db = client['university_db']
+        collection = db['student_course_grades']
+        
+        matched = set()
+        for chunk in batched(updates.items(), GET_MANY_CHUNK_SIZE):
+            query = {'$or': [{'student-ID': student_id, 'course-id': course_id} for (student_id, course_id), value in chunk]}
+            found = {(doc['student-ID'], doc['course-id'])
+                     for doc in collection.find(query, {'_id': 0, 'student-ID': 1, 'course-id': 1})}
+            requests = [UpdateOne({'student-ID': student_id, 'course-id': course_id},
+                                  {'$set': {'grade': grade, 'version': version, **mongo_digest_fields(student_id, course_id, grade)}})
+                        for (student_id, course_id), (grade, version) in chunk if (student_id, course_id) in found]
+            if requests:
+                collection.bulk_write(requests, ordered=False)
+            matched |= found
+        return matched
     finally:
         client.close()
 
 def set_mongo(student_id, course_id, new_grade):
     """Update the grade in MongoDB for the given student-ID and course-id."""
+    if not key_may_exist('MongoDB', (student_id, course_id)):
+        print(f"No record found in MongoDB for student-ID: {student_id}, course-id: {course_id}")
+        log_operation(MONGO_LOG, 'SET', student_id, course_id, new_grade)
+        return False
+    
     try:
         client = MongoClient('mongodb://localhost:27017/')
         db = client['university_db']
         collection = db['student_course_grades']
         
+        version = next_origin_seq('MongoDB')
         query = {'student-ID': student_id, 'course-id': course_id}
-        update = {'$set': {'grade': new_grade}}
+        update = {'$set': {'grade': new_grade, 'version': version, **mongo_digest_fields(student_id, course_id, new_grade)}}
         result = collection.update_one(query, update)
+        cache_invalidate('MongoDB', [(student_id, course_id)])
         
         if result.matched_count > 0:
             print(f"Grade updated to {new_grade} in MongoDB for student-ID: {student_id}, course-id: {course_id}")
         else:
             print(f"No record found in MongoDB for student-ID: {student_id}, course-id: {course_id}")
         
-        log_operation(MONGO_LOG, 'SET', student_id, course_id, new_grade)
+        log_operation(MONGO_LOG, 'SET', student_id, course_id, new_grade, version)
         return result.matched_count > 0
     
     except Exception as e:
@@ -181,18 +955,57 @@ def set_mongo(student_id, course_id, new_grade):
     finally:
         client.close()
 
+def fetch_grades_mongo(collection, keys):
+    """Return the current {(student_id, course_id): (grade, version)} for the given keys with a single MongoDB query."""
+    query = {'$or': [{'student-ID': student_id, 'course-id': course_id} for student_id, course_id in keys]}
+    projection = {'_id': 0, 'student-ID': 1, 'course-id': 1, 'grade': 1, 'version': 1}
+    return {(doc['student-ID'], doc['course-id']): (doc.get('grade'), doc.get('version') or 0)
+            for doc in collection.find(query, projection)}
+
+def apply_updates_mongo(updates):
+    """Apply ((student_id, course_id), (grade, timestamp, origin)) updates to MongoDB in batches.
+
+    Keys already at the same or a newer version are skipped; returns (applied, skipped, missing) counts.
+    """
+    client = MongoClient('mongodb://localhost:27017/')
+    try:
+        db = client['university_db']
+        collection = db['student_course_grades']
+        
+        # Apply updates batch by batch, writing only keys whose version is older
+        applied_count = skipped_count = missing_count = 0
+        max_version = 0
+        for batch in batched(updates, MERGE_BATCH_SIZE):
+            current = fetch_grades_mongo(collection, [key for key, value in batch])
+            for (student_id, course_id), (grade, timestamp, origin) in batch:
+                version = version_of(timestamp, origin)
+                if (student_id, course_id) not in current:
+                    missing_count += 1
+                    continue
+                # Last writer wins by version: skip keys already at this version or a newer one
+                if current[(student_id, course_id)][1] >= version:
+                    skipped_count += 1
+                    continue
+                query = {'student-ID': student_id, 'course-id': course_id}
+                update = {'$set': {'grade': grade, 'version': version, **mongo_digest_fields(student_id, course_id, grade)}}
+                result = collection.update_one(query, update)
+                if result.matched_count > 0:
+                    applied_count += 1
+                    max_version = max(max_version, version)
+                    current[(student_id, course_id)] = (grade, version)
+                    cache_invalidate('MongoDB', [(student_id, course_id)])
+                    complete_log_operation(MONGO_LOG, 'SET', student_id, course_id, timestamp, grade, origin)
+                else:
+                    missing_count += 1
+        observe_origin_seq('MongoDB', max_version)
+        return applied_count, skipped_count, missing_count
+    finally:
+        client.close()
+
 def merge_mongo(database_system):
     """Merge MongoDB with the state of another system based on operation logs."""
-    client = None
     try:
-        # Map database system to log file
-        log_map = {
-            'MongoDB': MONGO_LOG,
-            'MySQL': MYSQL_LOG,
-            'Hive': HIVE_LOG
-        }
-        
-        if database_system not in log_map:
+        if database_system not in LOG_MAP:
             print(f"Invalid database system: {database_system}. Choose MongoDB, MySQL, or Hive.")
             return False
         
@@ -200,66 +1013,103 @@ def merge_mongo(database_system):
             print("Cannot merge MongoDB with itself.")
             return False
         
-        local_log = MONGO_LOG
-        remote_log = log_map[database_system]
-        
-        # Get merged updates and total log lines
-        updates, total_local_lines, total_remote_lines = merge_logs(local_log, remote_log, 'MongoDB', database_system)
+        # Apply the merged updates and advance the checkpoints
+        counts = apply_merge('MongoDB', [database_system])
         
-        if not updates:
+        if counts is None:
             print("No updates to merge.")
-            log_merge_operation('MongoDB', database_system, total_local_lines, total_remote_lines)
             return False
         
-        # Connect to MongoDB
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['university_db']
-        collection = db['student_course_grades']
-        
-        # Apply updates
-        updated_count = 0
-        for (student_id, course_id), (grade, timestamp) in updates.items():
-            query = {'student-ID': student_id, 'course-id': course_id}
-            update = {'$set': {'grade': grade}}
-            result = collection.update_one(query, update)
-            if result.matched_count > 0:
-                updated_count += 1
-                complete_log_operation(MONGO_LOG, 'SET', student_id, course_id, timestamp, grade)
+        applied_count, skipped_count, missing_count = counts
         
-        # Log the merge operation
-        log_merge_operation('MongoDB', database_system, total_local_lines, total_remote_lines)
-        
-        print(f"Merged {updated_count} records into MongoDB from {database_system}.")
-        return updated_count > 0
+        print(f"Merged {applied_count} records into MongoDB from {database_system}.")
+        print(f"Debug: {applied_count} applied, {skipped_count} already up to date, {missing_count} missing")
+        return applied_count > 0
     
     except Exception as e:
         print(f"MongoDB Merge Error: {e}")
         return False
+
+def get_mysql_connection():
+    """Return a connection from the shared MySQL pool, created on first use; closing it returns it to the pool."""
+    global MYSQL_POOL
+    with MYSQL_POOL_LOCK:
+        if MYSQL_POOL is None:
+            MYSQL_POOL = pooling.MySQLConnectionPool(
+                pool_name='university_db',
+                pool_size=max(MYSQL_POOL_SIZE, MERGE_APPLY_SHARDS),
+                # Resetting the session on release would drop its prepared statements
+                pool_reset_session=not MYSQL_PREPARED,
+                # Reads and single-statement SETs commit on their own; multi-statement writes start a transaction
+                autocommit=True,
+                host='localhost',
+                user='root',
+                password='admin',
+                database='university_db'
+            )
+    return MYSQL_POOL.get_connection()
+
+def close_mysql_connection(conn):
+    """Roll back a transaction left open on a pooled connection, then return it to the pool.
+
+    The pool does not reset sessions (that would drop the prepared statements), so an open transaction would otherwise
+    hand its snapshot, or its uncommitted writes, to the next checkout. Connections are in autocommit mode, so only
+    a write that failed before its commit has one. The connection is returned even if it dropped or the rollback fails.
+    """
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except Exception as e:
+        print(f"MySQL Error: {e}")
     finally:
-        if client is not None:
-            client.close()
+        conn.close()
+
+def mysql_statement(conn, query, dictionary=False):
+    """Return (cursor, query) to run a MySQL statement on a pooled connection.
+
+    With MYSQL_PREPARED the cursor is a prepared cursor cached for the statement text on the connection's session,
+    and query is the text it was prepared from: the connector only reuses a prepared statement for that same object.
+    Otherwise it is a new cursor. Release it with release_mysql_statement.
+    """
+    if not MYSQL_PREPARED:
+        return conn.cursor(dictionary=dictionary), query
+    # Cache on the underlying connection, which outlives each pooled checkout. A reconnect (after wait_timeout or a
+    # server restart) starts a new session without the prepared statements, so the cache is keyed on the session id
+    cnx = getattr(conn, '_cnx', conn)
+    session_id = getattr(cnx, 'connection_id', None)
+    if getattr(cnx, 'prepared_session_id', None) != session_id or not hasattr(cnx, 'prepared_statements'):
+        cnx.prepared_statements = {}
+        cnx.prepared_session_id = session_id
+    statement = cnx.prepared_statements.get((query, dictionary))
+    if statement is None:
+        statement = (conn.cursor(prepared=True, dictionary=dictionary), query)
+        cnx.prepared_statements[(query, dictionary)] = statement
+    return statement
+
+def release_mysql_statement(cursor):
+    """Close a cursor from mysql_statement, unless it is a cached prepared cursor."""
+    if not MYSQL_PREPARED:
+        cursor.close()
 
 def get_mysql(student_id, course_id):
-    """Retrieve a row from MySQL based on student_id and course_id."""
+    """Retrieve a row from MySQL based on student_id and course_id. Served from the GET cache when possible."""
+    hit, result = cache_lookup('MySQL', (student_id, course_id))
+    if hit:
+        print("MySQL Result:", result)
+        log_operation(MYSQL_LOG, 'GET', student_id, course_id)
+        return result
+    
+    if not key_may_exist('MySQL', (student_id, course_id)):
+        print(f"No record found in MySQL for student_id: {student_id}, course_id: {course_id}")
+        log_operation(MYSQL_LOG, 'GET', student_id, course_id)
+        return None
+    
     try:
-        conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='admin',
-            database='university_db'
-        )
-        cursor = conn.cursor(dictionary=True)
-        
-        query = """
-        SELECT student_id, course_id, roll_no, email_id, grade
-        FROM student_course_grades
-        WHERE student_id = %s AND course_id = %s
-        """
-        cursor.execute(query, (student_id, course_id))
-        result = cursor.fetchone()
+        result = fetch_row_mysql(student_id, course_id)
         
         if result:
             print("MySQL Result:", result)
+            cache_store('MySQL', (student_id, course_id), result)
         else:
             print(f"No record found in MySQL for student_id: {student_id}, course_id: {course_id}")
         
@@ -269,268 +1119,2051 @@ def get_mysql(student_id, course_id):
     except Exception as e:
         print(f"MySQL Error: {e}")
         return None
+
+def fetch_row_mysql(student_id, course_id):
+    """Return the MySQL row for student_id and course_id, or None, without the cache, printing or logging."""
+    conn = cursor = None
+    try:
+        conn = get_mysql_connection()
+        cursor, query = mysql_statement(conn, """
+        SELECT student_id, course_id, roll_no, email_id, grade
+        FROM student_course_grades
+        WHERE student_id = %s AND course_id = %s
+        """, dictionary=True)
+        cursor.execute(query, (student_id, course_id))
+        # Read every row so the prepared cursor has no pending result
+        rows = cursor.fetchall()
+        return rows[0] if rows else None
+    finally:
+        if cursor:
+            release_mysql_statement(cursor)
+        if conn:
+            close_mysql_connection(conn)
+
+def get_many_mysql(keys):
+    """Return {(student_id, course_id): row} for the given keys found in MySQL, one IN query per GET_MANY_CHUNK_SIZE keys."""
+    conn = get_mysql_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        
+        rows = {}
+        for chunk in batched(keys, GET_MANY_CHUNK_SIZE):
+            query = """
+            SELECT student_id, course_id, roll_no, email_id, grade
+            FROM student_course_grades
+            WHERE (student_id, course_id) IN (%s)
+            """ % ', '.join(['(%s, %s)'] * len(chunk))
+            cursor.execute(query, [value for key in chunk for value in key])
+            for row in cursor.fetchall():
+                rows[(row['student_id'], row['course_id'])] = row
+        return rows
+    finally:
+        if cursor:
+            cursor.close()
+        close_mysql_connection(conn)
+
+def set_many_mysql(updates):
+    """Write {(student_id, course_id): (grade, version)} to MySQL in one transaction and return the set of keys that matched a row.
+
+    Per GET_MANY_CHUNK_SIZE keys, one SELECT ... FOR UPDATE finds and locks the existing rows and one UPDATE joined
+    against the new values writes them; everything is committed once at the end.
+    """
+    conn = get_mysql_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        
+        conn.start_transaction()
+        matched = set()
+        for chunk in batched(updates.items(), GET_MANY_CHUNK_SIZE):
+            cursor.execute("""
+            SELECT student_id, course_id
+            FROM student_course_grades
+            WHERE (student_id, course_id) IN (%s)
+            FOR UPDATE
+            """ % ', '.join(['(%s, %s)'] * len(chunk)), [value for key, update in chunk for value in key])
+            found = set(cursor.fetchall())
+            rows = [(key, update) for key, update in chunk if key in found]
+            if rows:
+                cursor.execute("""
+                UPDATE student_course_grades g
+                JOIN (%s) u
+                ON g.student_id = u.student_id AND g.course_id = u.course_id
+                SET g.grade = u.grade, g.version = u.version
+                """ % ' UNION ALL '.join(['SELECT %s AS student_id, %s AS course_id, %s AS grade, %s AS version'] * len(rows)),
+                               [value for (student_id, course_id), (grade, version) in rows
+                                for value in (student_id, course_id, grade, version)])
+            matched |= found
+        conn.commit()
+        return matched
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        close_mysql_connection(conn)
+
+def set_mysql(student_id, course_id, new_grade):
+    """Update the grade in MySQL for the given student_id and course_id."""
+    if not key_may_exist('MySQL', (student_id, course_id)):
+        print(f"No record found in MySQL for student_id: {student_id}, course_id: {course_id}")
+        log_operation(MYSQL_LOG, 'SET', student_id, course_id, new_grade)
+        return False
+    
+    conn = cursor = None
+    try:
+        conn = get_mysql_connection()
+        cursor, query = mysql_statement(conn, """
+        UPDATE student_course_grades
+        SET grade = %s, version = %s
+        WHERE student_id = %s AND course_id = %s
+        """)
+        
+        version = next_origin_seq('MySQL')
+        # A single UPDATE, committed by autocommit
+        cursor.execute(query, (new_grade, version, student_id, course_id))
+        cache_invalidate('MySQL', [(student_id, course_id)])
+        
+        if cursor.rowcount > 0:
+            print(f"Grade updated to {new_grade} in MySQL for student_id: {student_id}, course_id: {course_id}")
+        else:
+            print(f"No record found in MySQL for student_id: {student_id}, course_id: {course_id}")
+        
+        log_operation(MYSQL_LOG, 'SET', student_id, course_id, new_grade, version)
+        return cursor.rowcount > 0
+    
+    except Exception as e:
+        print(f"MySQL Error: {e}")
+        return False
+    finally:
+        if cursor:
+            release_mysql_statement(cursor)
+        if conn:
+            close_mysql_connection(conn)
+
+# Text of the key lookup statement per padded number of keys (a power of two), so every connection prepares
+# at most one statement per size rather than one per distinct batch length
+FETCH_GRADES_QUERIES = {}
+
+def fetch_grades_mysql(conn, keys):
+    """Return the current {(student_id, course_id): (grade, version)} for the given keys with a single MySQL query.
+
+    The IN list is padded to the next power of two by repeating the last key.
+    """
+    if not keys:
+        return {}
+    size = 1 << (len(keys) - 1).bit_length()
+    if size not in FETCH_GRADES_QUERIES:
+        FETCH_GRADES_QUERIES[size] = """
+        SELECT student_id, course_id, grade, version
+        FROM student_course_grades
+        WHERE (student_id, course_id) IN (%s)
+        """ % ', '.join(['(%s, %s)'] * size)
+    cursor, query = mysql_statement(conn, FETCH_GRADES_QUERIES[size])
+    try:
+        padded = list(keys) + [keys[-1]] * (size - len(keys))
+        cursor.execute(query, [value for key in padded for value in key])
+        return {(student_id, course_id): (grade, version or 0) for student_id, course_id, grade, version in cursor.fetchall()}
+    finally:
+        release_mysql_statement(cursor)
+
+def apply_updates_mysql(updates):
+    """Apply ((student_id, course_id), (grade, timestamp, origin)) updates to MySQL, committing once per batch.
+
+    Keys already at the same or a newer version are skipped; returns (applied, skipped, missing) counts.
+    """
+    conn = get_mysql_connection()
+    cursor = None
+    try:
+        cursor, query = mysql_statement(conn, """
+        UPDATE student_course_grades
+        SET grade = %s, version = %s
+        WHERE student_id = %s AND course_id = %s AND version < %s
+        """)
+        
+        # Apply updates, writing only keys whose version is older
+        applied_count = skipped_count = missing_count = 0
+        max_version = 0
+        for batch in batched(updates, MERGE_BATCH_SIZE):
+            current = fetch_grades_mysql(conn, [key for key, value in batch])
+            conn.start_transaction()
+            for (student_id, course_id), (grade, timestamp, origin) in batch:
+                version = version_of(timestamp, origin)
+                if (student_id, course_id) not in current:
+                    missing_count += 1
+                    continue
+                # Last writer wins by version: skip keys already at this version or a newer one
+                if current[(student_id, course_id)][1] >= version:
+                    skipped_count += 1
+                    continue
+                cursor.execute(query, (grade, version, student_id, course_id, version))
+                if cursor.rowcount > 0:
+                    applied_count += 1
+                    max_version = max(max_version, version)
+                    current[(student_id, course_id)] = (grade, version)
+                    cache_invalidate('MySQL', [(student_id, course_id)])
+                    complete_log_operation(MYSQL_LOG, 'SET', student_id, course_id, timestamp, grade, origin)
+                else:
+                    # The row was written with a newer version since it was read
+                    skipped_count += 1
+            # Commit once per batch
+            conn.commit()
+        observe_origin_seq('MySQL', max_version)
+        return applied_count, skipped_count, missing_count
+    finally:
+        if cursor:
+            release_mysql_statement(cursor)
+        close_mysql_connection(conn)
+
+def merge_mysql(database_system):
+    """Merge MySQL with the state of another system based on operation logs."""
+    try:
+        if database_system not in LOG_MAP:
+            print(f"Invalid database system: {database_system}. Choose MongoDB, MySQL, or Hive.")
+            return False
+        
+        if database_system == 'MySQL':
+            print("Cannot merge MySQL with itself.")
+            return False
+        
+        # Apply the merged updates and advance the checkpoints
+        counts = apply_merge('MySQL', [database_system])
+        
+        if counts is None:
+            print("No updates to merge.")
+            return False
+        
+        applied_count, skipped_count, missing_count = counts
+        
+        print(f"Merged {applied_count} records into MySQL from {database_system}.")
+        print(f"Debug: {applied_count} applied, {skipped_count} already up to date, {missing_count} missing")
+        return applied_count > 0
+    
+    except Exception as e:
+        print(f"MySQL Merge Error: {e}")
+        return False
+
+def build_hive_snapshot():
+    """Rebuild the local Hive snapshot from a single scan of the Hive table.
+
+    Its watermark is the size of HIVE_LOG taken before the scan, so SETs logged during the scan are replayed on the next refresh.
+    """
+    flush_hive_writes()
+    watermark = os.path.getsize(HIVE_LOG) if os.path.exists(HIVE_LOG) else 0
+    conn = hive.connect(host='localhost', port=10000, database='default')
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT student_id, course_id, roll_no, email_id, grade, version FROM student_course_grades")
+        
+        tmp_file = HIVE_SNAPSHOT_FILE + '.tmp'
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        snapshot = sqlite3.connect(tmp_file)
+        try:
+            snapshot.execute("""
+            CREATE TABLE grades (
+                student_id TEXT,
+                course_id TEXT,
+                roll_no TEXT,
+                email_id TEXT,
+                grade TEXT,
+                version INTEGER,
+                PRIMARY KEY (student_id, course_id)
+            )
+            """)
+            snapshot.execute("CREATE TABLE watermark (log_offset INTEGER, refreshed TEXT)")
+            row_count = 0
+            while True:
+                rows = cursor.fetchmany(MERGE_BATCH_SIZE)
+                if not rows:
+                    break
+                snapshot.executemany("INSERT OR REPLACE INTO grades VALUES (?, ?, ?, ?, ?, ?)",
+                                     [row[:5] + (row[5] or 0,) for row in rows])
+                row_count += len(rows)
+            snapshot.execute("INSERT INTO watermark VALUES (?, ?)", (watermark, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            snapshot.commit()
+        finally:
+            snapshot.close()
+        os.replace(tmp_file, HIVE_SNAPSHOT_FILE)
+        print(f"Hive snapshot built with {row_count} records.")
+        return row_count
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def refresh_hive_snapshot(snapshot):
+    """Apply the SET records logged in HIVE_LOG since the snapshot's watermark and advance it.
+
+    A record only replaces a row at an older version. Returns True if the snapshot now covers the whole log,
+    False if it cannot be trusted (the log was truncated or ends in a partial line).
+    """
+    log_offset, = snapshot.execute("SELECT log_offset FROM watermark").fetchone()
+    size = os.path.getsize(HIVE_LOG) if os.path.exists(HIVE_LOG) else 0
+    if size < log_offset:
+        return False
+    if size == log_offset:
+        return True
+    with open(HIVE_LOG, 'rb') as f:
+        f.seek(log_offset)
+        data = f.read(size - log_offset)
+    # Only complete lines move the watermark
+    end = data.rfind(b'\n') + 1
+    for line in data[:end].decode().split('\n'):
+        record = parse_set_line(line.strip())
+        if record:
+            timestamp, (student_id, course_id), grade, origin = record
+            version = version_of(timestamp, origin)
+            snapshot.execute("""
+            UPDATE grades SET grade = ?, version = ?
+            WHERE student_id = ? AND course_id = ? AND version < ?
+            """, (grade, version, student_id, course_id, version))
+    snapshot.execute("UPDATE watermark SET log_offset = ?, refreshed = ?",
+                     (log_offset + end, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    snapshot.commit()
+    return log_offset + end == size
+
+def snapshot_get_many_hive(keys):
+    """Look (student_id, course_id) keys up in the local Hive snapshot, building it on first use and refreshing it from HIVE_LOG.
+
+    Returns {key: row} for the keys found when the snapshot is current, or None when Hive has to be queried.
+    """
+    if not os.path.exists(HIVE_SNAPSHOT_FILE):
+        build_hive_snapshot()
+    snapshot = sqlite3.connect(HIVE_SNAPSHOT_FILE)
+    try:
+        if not refresh_hive_snapshot(snapshot):
+            return None
+        rows = {}
+        for key in keys:
+            row = snapshot.execute("""
+            SELECT student_id, course_id, roll_no, email_id, grade
+            FROM grades
+            WHERE student_id = ? AND course_id = ?
+            """, key).fetchone()
+            if row is not None:
+                rows[key] = dict(zip(('student_id', 'course_id', 'roll_no', 'email_id', 'grade'), row))
+        return rows
+    finally:
+        snapshot.close()
+
+def snapshot_get_hive(student_id, course_id):
+    """Look a key up in the local Hive snapshot, building it on first use and refreshing it from HIVE_LOG.
+
+    Returns (True, row or None) when the snapshot is current, or (False, None) when Hive has to be queried.
+    """
+    rows = snapshot_get_many_hive([(student_id, course_id)])
+    if rows is None:
+        return False, None
+    return True, rows.get((student_id, course_id))
+
+def get_hive(student_id, course_id):
+    """Retrieve a row from Hive based on student_id and course_id. Served from the GET cache when possible,
+    then from the local Hive snapshot when HIVE_SNAPSHOT is set and it is current. A pending write-behind SET overrides the grade."""
+    hit, result = cache_lookup('Hive', (student_id, course_id))
+    if hit:
+        result = overlay_hive_row((student_id, course_id), result)
+        print("Hive Result:", result)
+        log_operation(HIVE_LOG, 'GET', student_id, course_id)
+        return result
+    
+    if not key_may_exist('Hive', (student_id, course_id)):
+        print(f"No record found in Hive for student_id: {student_id}, course_id: {course_id}")
+        log_operation(HIVE_LOG, 'GET', student_id, course_id)
+        return None
+    
+    if HIVE_SNAPSHOT:
+        try:
+            current, result = snapshot_get_hive(student_id, course_id)
+        except Exception as e:
+            print(f"Hive Snapshot Error: {e}")
+            current = False
+        if current:
+            if result:
+                cache_store('Hive', (student_id, course_id), result)
+                result = overlay_hive_row((student_id, course_id), result)
+                print("Hive Result:", result)
+            else:
+                print(f"No record found in Hive for student_id: {student_id}, course_id: {course_id}")
+            log_operation(HIVE_LOG, 'GET', student_id, course_id)
+            return result
+    
+    try:
+        result_dict = fetch_row_hive(student_id, course_id)
+        
+        if result_dict:
+            cache_store('Hive', (student_id, course_id), result_dict)
+            result_dict = overlay_hive_row((student_id, course_id), result_dict)
+            print("Hive Result:", result_dict)
+        else:
+            print(f"No record found in Hive for student_id: {student_id}, course_id: {course_id}")
+        
+        log_operation(HIVE_LOG, 'GET', student_id, course_id)
+        return result_dict
+    
+    except Exception as e:
+        print(f"Hive Error: {e}")
+        return None
+
+def fetch_row_hive(student_id, course_id):
+    """Return the Hive table row for student_id and course_id, or None, without the cache, snapshot, overlay, printing or logging."""
+    conn = hive.connect(host='localhost', port=10000, database='default')
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        
+        query = """
+        SELECT student_id, course_id, roll_no, email_id, grade
+        FROM student_course_grades
+        WHERE student_id = '%s' AND course_id = '%s'
+        """
+        cursor.execute(query % (student_id, course_id))
+        result = cursor.fetchone()
+        if not result:
+            return None
+        # Convert tuple to dict for consistent output
+        return {
+            'student_id': result[0],
+            'course_id': result[1],
+            'roll_no': result[2],
+            'email_id': result[3],
+            'grade': result[4]
+        }
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def hive_temp_table(prefix):
+    """Return a Hive temporary table name starting with prefix, unique to this process and call."""
+    return f"{prefix}_{os.getpid()}_{next(HIVE_TEMP_TABLE_IDS)}"
+
+def get_many_hive(keys):
+    """Return {(student_id, course_id): row} for the given keys found in Hive with one join against a staged key table."""
+    conn = hive.connect(host='localhost', port=10000, database='default')
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        keys_table = hive_temp_table('get_keys')
+        cursor.execute("""
+        CREATE TEMPORARY TABLE %s (
+            student_id STRING,
+            course_id STRING
+        )
+        """ % keys_table)
+        for chunk in batched(keys, GET_MANY_CHUNK_SIZE):
+            values = ', '.join("('%s', '%s')" % (student_id, course_id) for student_id, course_id in chunk)
+            cursor.execute("INSERT INTO TABLE %s VALUES %s" % (keys_table, values))
+        
+        cursor.execute("""
+        SELECT g.student_id, g.course_id, g.roll_no, g.email_id, g.grade
+        FROM student_course_grades g
+        JOIN %s k
+        ON g.student_id = k.student_id AND g.course_id = k.course_id
+        """ % keys_table)
+        return {(student_id, course_id): {'student_id': student_id, 'course_id': course_id, 'roll_no': roll_no,
+                                          'email_id': email_id, 'grade': grade}
+                for student_id, course_id, roll_no, email_id, grade in cursor.fetchall()}
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def set_hive(student_id, course_id, new_grade):
+    """Update the grade in Hive for the given student_id and course_id."""
+    if not key_may_exist('Hive', (student_id, course_id)):
+        print(f"No record found in Hive for student_id: {student_id}, course_id: {course_id}")
+        log_operation(HIVE_LOG, 'SET', student_id, course_id, new_grade)
+        return False
+    
+    if HIVE_WRITE_BEHIND:
+        queue_hive_writes({(student_id, course_id): (new_grade, next_origin_seq('Hive'))})
+        print(f"Grade update to {new_grade} queued for Hive for student_id: {student_id}, course_id: {course_id}")
+        return True
+    
+    try:
+        conn = hive.connect(host='localhost', port=10000, database='default')
+        cursor = conn.cursor()
+        
+        version = next_origin_seq('Hive')
+        query = """
+        INSERT OVERWRITE TABLE student_course_grades
+        SELECT student_id, course_id, roll_no, email_id, 
+               CASE WHEN student_id = '%s' AND course_id = '%s' THEN '%s' ELSE grade END,
+               CASE WHEN student_id = '%s' AND course_id = '%s' THEN %d ELSE version END
+        FROM student_course_grades
+        """
+        cursor.execute(query % (student_id, course_id, new_grade, student_id, course_id, version))
+        conn.commit()
+        cache_invalidate('Hive', [(student_id, course_id)])
+        
+        # Verify update
+        cursor.execute("""
+        SELECT COUNT(*) 
+        FROM student_course_grades 
+        WHERE student_id = '%s' AND course_id = '%s' AND grade = '%s'
+        """ % (student_id, course_id, new_grade))
+        updated = cursor.fetchone()[0]
+        
+        if updated > 0:
+            print(f"Grade updated to {new_grade} in Hive for student_id: {student_id}, course_id: {course_id}")
+        else:
+            print(f"No record found in Hive for student_id: {student_id}, course_id: {course_id}")
+        
+        log_operation(HIVE_LOG, 'SET', student_id, course_id, new_grade, version)
+        return updated > 0
+    
+    except Exception as e:
+        print(f"Hive Error: {e}")
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+def set_many_hive(updates):
+    """Write {(student_id, course_id): (grade, version)} to Hive with a single table rewrite and return the set of keys that matched a row.
+
+    A row already at the same or a newer version, e.g. from a MERGE that ran while the SET was pending, keeps its grade;
+    when every matched row does, the rewrite is skipped.
+    """
+    conn = hive.connect(host='localhost', port=10000, database='default')
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        now = datetime.now()
+        updates_table = stage_hive_updates(cursor, ((key, (grade, now, ('Hive', version))) for key, (grade, version) in updates.items()))
+        
+        cursor.execute("""
+        SELECT u.student_id, u.course_id, u.version > COALESCE(g.version, 0)
+        FROM %s u
+        JOIN student_course_grades g
+        ON g.student_id = u.student_id AND g.course_id = u.course_id
+        """ % updates_table)
+        rows = cursor.fetchall()
+        matched = {(student_id, course_id) for student_id, course_id, changed in rows}
+        if not any(changed for student_id, course_id, changed in rows):
+            return matched
+        
+        # Rewrite the table once, taking the staged grade and version wherever a key matches with an older version
+        cursor.execute("""
+        INSERT OVERWRITE TABLE student_course_grades
+        SELECT g.student_id, g.course_id, g.roll_no, g.email_id,
+               CASE WHEN u.changed THEN u.grade ELSE g.grade END,
+               CASE WHEN u.changed THEN u.version ELSE g.version END
+        FROM student_course_grades g
+        LEFT OUTER JOIN (
+            SELECT u.student_id, u.course_id, u.grade, u.version,
+                   u.version > COALESCE(g.version, 0) AS changed
+            FROM %s u
+            JOIN student_course_grades g
+            ON g.student_id = u.student_id AND g.course_id = u.course_id
+        ) u
+        ON g.student_id = u.student_id AND g.course_id = u.course_id
+        """ % updates_table)
+        conn.commit()
+        return matched
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def overlay_hive_row(key, row):
+    """Return a Hive row with the grade of a pending write-behind SET for its key, if any."""
+    if row is None or not HIVE_PENDING:
+        return row
+    with HIVE_PENDING_LOCK:
+        pending = HIVE_PENDING.get(key)
+    return dict(row, grade=pending[0]) if pending else row
+
+def start_hive_flush_timer():
+    """Schedule a flush HIVE_WRITE_BEHIND_MAX_SECONDS from now unless one is scheduled; call with HIVE_PENDING_LOCK held."""
+    global HIVE_FLUSH_TIMER
+    if HIVE_FLUSH_TIMER is None:
+        HIVE_FLUSH_TIMER = threading.Timer(HIVE_WRITE_BEHIND_MAX_SECONDS, flush_hive_writes)
+        HIVE_FLUSH_TIMER.daemon = True
+        HIVE_FLUSH_TIMER.start()
+
+def queue_hive_writes(updates, keys=None):
+    """Log {(student_id, course_id): (grade, version)} SETs to HIVE_LOG, add those in keys (default all) to the
+    Hive write-behind overlay and return the keys added.
+
+    Each SET is logged, and the queued ones appended to HIVE_PENDING_FILE, before it is pending, under
+    HIVE_PENDING_LOCK, so any SET in that file when a flush takes its snapshot is in that snapshot or already written.
+    The overlay is flushed at once when it reaches HIVE_WRITE_BEHIND_MAX_PENDING keys.
+    """
+    recover_hive_writes()
+    keys = set(updates) if keys is None else set(keys)
+    with HIVE_PENDING_LOCK:
+        log_set_operations(HIVE_LOG, [(key, grade) for key, (grade, version) in updates.items()],
+                           [version for grade, version in updates.values()])
+        append_hive_pending({key: updates[key] for key in keys})
+        for key in keys:
+            HIVE_PENDING.pop(key, None)
+            HIVE_PENDING[key] = updates[key]
+        pending_count = len(HIVE_PENDING)
+        start_hive_flush_timer()
+    cache_invalidate('Hive', keys)
+    if pending_count >= HIVE_WRITE_BEHIND_MAX_PENDING:
+        flush_hive_writes()
+    return keys
+
+def append_hive_pending(updates):
+    """Append queued {(student_id, course_id): (grade, version)} SETs to HIVE_PENDING_FILE in a single write."""
+    with open(HIVE_PENDING_FILE, 'a') as f:
+        f.write(''.join(json.dumps([student_id, course_id, grade, version]) + '\n'
+                        for (student_id, course_id), (grade, version) in updates.items()))
+
+def recover_hive_writes():
+    """Queue the SETs appended to HIVE_PENDING_FILE after the HIVE_FLUSHED_FILE offset again, once per process
+    and only with HIVE_WRITE_BEHIND, which also registers the flush at exit.
+
+    They were pending in a process that exited before flushing them. SETs that did reach the table are no-ops in
+    set_many_hive, which keeps newer versions. SETs written synchronously are never in the file.
+    """
+    global HIVE_RECOVERED
+    if not HIVE_WRITE_BEHIND:
+        return
+    with HIVE_FLUSH_LOCK:
+        if HIVE_RECOVERED:
+            return
+        HIVE_RECOVERED = True
+        # Pending SETs are already logged and recovered by the next process otherwise, but write them to the table before exiting
+        atexit.register(flush_hive_writes)
+        if not os.path.exists(HIVE_PENDING_FILE):
+            return
+        end_byte = os.path.getsize(HIVE_PENDING_FILE)
+        start_byte = 0
+        if os.path.exists(HIVE_FLUSHED_FILE):
+            with open(HIVE_FLUSHED_FILE, 'r') as f:
+                start_byte = min(json.load(f)['offset'], end_byte)
+        
+        unflushed = {}
+        with open(HIVE_PENDING_FILE, 'rb') as f:
+            f.seek(start_byte)
+            data = f.read(end_byte - start_byte).decode()
+        # A partial last line was never queued
+        for line in data.split('\n')[:-1]:
+            student_id, course_id, grade, version = json.loads(line)
+            key = (student_id, course_id)
+            if key not in unflushed or version > unflushed[key][1]:
+                unflushed[key] = (grade, version)
+        if not unflushed:
+            return
+        with HIVE_PENDING_LOCK:
+            for key, (grade, version) in unflushed.items():
+                # A SET queued since this process started is newer
+                if key not in HIVE_PENDING:
+                    HIVE_PENDING[key] = (grade, version)
+            start_hive_flush_timer()
+        cache_invalidate('Hive', unflushed)
+        print(f"Recovered {len(unflushed)} Hive SETs queued after the last write-behind flush.")
+
+def save_hive_flushed_offset(offset):
+    """Persist the HIVE_PENDING_FILE byte offset before which every write-behind SET is in the table, atomically."""
+    tmp_file = HIVE_FLUSHED_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({'offset': offset}, f)
+    os.replace(tmp_file, HIVE_FLUSHED_FILE)
+
+def flush_hive_writes():
+    """Write the pending write-behind SETs to Hive in one table rewrite and return the number of keys that matched a row.
+
+    Keys stay in the overlay until the rewrite commits, and are then dropped unless a newer SET arrived meanwhile.
+    On error they stay pending for the next flush and None is returned. Hive readers that bypass the overlay call
+    this first, so an empty overlay costs nothing. After a rewrite, the HIVE_PENDING_FILE offset taken with the
+    snapshot is saved to HIVE_FLUSHED_FILE for recover_hive_writes; once nothing is pending the file is emptied.
+    """
+    global HIVE_FLUSH_TIMER
+    recover_hive_writes()
+    with HIVE_FLUSH_LOCK:
+        with HIVE_PENDING_LOCK:
+            pending = dict(HIVE_PENDING)
+            pending_offset = os.path.getsize(HIVE_PENDING_FILE) if os.path.exists(HIVE_PENDING_FILE) else 0
+            if HIVE_FLUSH_TIMER is not None:
+                HIVE_FLUSH_TIMER.cancel()
+                HIVE_FLUSH_TIMER = None
+        if not pending:
+            return 0
+        
+        try:
+            matched = set_many_hive(pending)
+        except Exception as e:
+            print(f"Hive Flush Error: {e}")
+            with HIVE_PENDING_LOCK:
+                start_hive_flush_timer()
+            return None
+        
+        with HIVE_PENDING_LOCK:
+            for key, update in pending.items():
+                if HIVE_PENDING.get(key) == update:
+                    del HIVE_PENDING[key]
+            if HIVE_PENDING:
+                start_hive_flush_timer()
+                save_hive_flushed_offset(pending_offset)
+            else:
+                # Everything queued is in the table; a crash before the offset is saved leaves it past the end, read as 0
+                open(HIVE_PENDING_FILE, 'w').close()
+                save_hive_flushed_offset(0)
+        cache_invalidate('Hive', pending)
+        print(f"Flushed {len(pending)} pending SETs to Hive in one rewrite ({len(matched)} matched).")
+        return len(matched)
+
+def stage_hive_updates(cursor, updates):
+    """Load ((student_id, course_id), (grade, timestamp, origin)) updates into a new temporary Hive staging table, one batch
+    at a time, and return its name.
+
+    The log timestamp and origin tag are staged with each row, so callers read them back instead of holding the updates.
+    """
+    updates_table = hive_temp_table('merge_updates')
+    cursor.execute("""
+    CREATE TEMPORARY TABLE %s (
+        student_id STRING,
+        course_id STRING,
+        grade STRING,
+        version BIGINT,
+        logged_at STRING,
+        origin STRING,
+        origin_seq BIGINT
+    )
+    """ % updates_table)
+    for batch in batched(updates, MERGE_BATCH_SIZE):
+        values = ', '.join("('%s', '%s', '%s', %d, '%s', %s)" % (
+                               student_id, course_id, grade, version_of(timestamp, origin), timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                               "'%s', %d" % origin if origin is not None else 'NULL, NULL')
+                           for (student_id, course_id), (grade, timestamp, origin) in batch)
+        cursor.execute("INSERT INTO TABLE %s VALUES %s" % (updates_table, values))
+    return updates_table
+
+def apply_updates_hive(updates):
+    """Apply ((student_id, course_id), (grade, timestamp, origin)) updates to Hive with a single table rewrite.
+
+    Keys already at the same or a newer version are skipped, and the rewrite is skipped entirely when nothing changes;
+    returns (applied, skipped, missing) counts.
+    """
+    # Pending write-behind SETs reach the table first, so the version checks below see them
+    flush_hive_writes()
+    conn = hive.connect(host='localhost', port=10000, database='default')
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        updates_table = stage_hive_updates(cursor, updates)
+        
+        # Mark every staged key against the current versions in one query; the marks stay in Hive
+        changes_table = hive_temp_table('merge_changes')
+        cursor.execute("""
+        CREATE TEMPORARY TABLE %s AS
+        SELECT u.student_id, u.course_id, u.grade, u.version, u.logged_at, u.origin, u.origin_seq,
+               g.student_id IS NULL AS missing,
+               g.student_id IS NOT NULL AND u.version > COALESCE(g.version, 0) AS changed
+        FROM %s u
+        LEFT OUTER JOIN student_course_grades g
+        ON g.student_id = u.student_id AND g.course_id = u.course_id
+        """ % (changes_table, updates_table))
+        cursor.execute("SELECT COUNT(*), SUM(IF(missing, 1, 0)), SUM(IF(changed, 1, 0)) FROM %s" % changes_table)
+        staged_count, missing_count, changed_count = cursor.fetchone()
+        missing_count, changed_count = missing_count or 0, changed_count or 0
+        skipped_count = staged_count - missing_count - changed_count
+        
+        if not changed_count:
+            return 0, skipped_count, missing_count
+        
+        # Rewrite the table once, taking the staged grade and version wherever a key matches and changes
+        cursor.execute("""
+        INSERT OVERWRITE TABLE student_course_grades
+        SELECT g.student_id, g.course_id, g.roll_no, g.email_id,
+               CASE WHEN c.student_id IS NOT NULL THEN c.grade ELSE g.grade END,
+               CASE WHEN c.student_id IS NOT NULL THEN c.version ELSE g.version END
+        FROM student_course_grades g
+        LEFT OUTER JOIN (SELECT * FROM %s WHERE changed) c
+        ON g.student_id = c.student_id AND g.course_id = c.course_id
+        """ % changes_table)
+        conn.commit()
+        
+        # Verify update, streaming the applied rows back with the log timestamp and origin they were staged with
+        cursor.execute("""
+        SELECT c.student_id, c.course_id, c.grade, c.version, c.logged_at, c.origin, c.origin_seq
+        FROM %s c
+        JOIN student_course_grades g
+        ON g.student_id = c.student_id AND g.course_id = c.course_id AND g.grade = c.grade
+        WHERE c.changed
+        """ % changes_table)
+        applied_count = 0
+        max_version = 0
+        while True:
+            rows = cursor.fetchmany(MERGE_BATCH_SIZE)
+            if not rows:
+                break
+            cache_invalidate('Hive', [(student_id, course_id) for student_id, course_id, *rest in rows])
+            for student_id, course_id, grade, version, logged_at, origin, origin_seq in rows:
+                applied_count += 1
+                max_version = max(max_version, version)
+                complete_log_operation(HIVE_LOG, 'SET', student_id, course_id, datetime.strptime(logged_at, '%Y-%m-%d %H:%M:%S'),
+                                       grade, (origin, origin_seq) if origin is not None else None)
+        observe_origin_seq('Hive', max_version)
+        return applied_count, skipped_count, missing_count
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def merge_hive(database_system):
+    """Merge Hive with the state of another system based on operation logs."""
+    try:
+        if database_system not in LOG_MAP:
+            print(f"Invalid database system: {database_system}. Choose MongoDB, MySQL, or Hive.")
+            return False
+        
+        if database_system == 'Hive':
+            print("Cannot merge Hive with itself.")
+            return False
+        
+        # Apply the merged updates and advance the checkpoints
+        counts = apply_merge('Hive', [database_system])
+        
+        if counts is None:
+            print("No updates to merge.")
+            return False
+        
+        applied_count, skipped_count, missing_count = counts
+        
+        print(f"Merged {applied_count} records into Hive from {database_system}.")
+        print(f"Debug: {applied_count} applied, {skipped_count} already up to date, {missing_count} missing")
+        return applied_count > 0
+    
+    except Exception as e:
+        print(f"Hive Merge Error: {e}")
+        return False
+
+# Functions that apply merged updates to each database system
+APPLY_UPDATES = {
+    'MongoDB': apply_updates_mongo,
+    'MySQL': apply_updates_mysql,
+    'Hive': apply_updates_hive
+}
+
+# Functions that look up many keys in each database system at once
+GET_MANY = {
+    'MongoDB': get_many_mongo,
+    'MySQL': get_many_mysql,
+    'Hive': get_many_hive
+}
+
+def get_many(database_system, keys, quiet=False):
+    """Retrieve the rows for many (student_id, course_id) keys from one system as {key: row}; missing keys are left out.
+
+    Cached rows are served from the GET cache and the rest are fetched with one batched lookup; all GETs, repeats included,
+    are logged in one write. With HIVE_SNAPSHOT, Hive keys are looked up in the snapshot instead whenever it is
+    current, as get_hive does, so keys it lacks are not found. Returns None if the lookup failed. quiet=True leaves
+    printing the results, and the error of a failed lookup, to the caller.
+    """
+    requested = [tuple(key) for key in keys]
+    keys = list(dict.fromkeys(requested))
+    rows = {}
+    misses = []
+    for key in keys:
+        hit, row = cache_lookup(database_system, key)
+        if hit:
+            rows[key] = row
+        elif key_may_exist(database_system, key):
+            misses.append(key)
+    
+    if misses and database_system == 'Hive' and HIVE_SNAPSHOT:
+        try:
+            snapshot_rows = snapshot_get_many_hive(misses)
+        except Exception as e:
+            print(f"Hive Snapshot Error: {e}")
+            snapshot_rows = None
+        if snapshot_rows is not None:
+            for key, row in snapshot_rows.items():
+                cache_store('Hive', key, row)
+                rows[key] = row
+            # A current snapshot holds every Hive row, so Hive is only queried when it could not be read
+            misses = []
+    
+    try:
+        if misses:
+            for key, row in GET_MANY[database_system](misses).items():
+                cache_store(database_system, key, row)
+                rows[key] = row
+        if database_system == 'Hive':
+            rows = {key: overlay_hive_row(key, row) for key, row in rows.items()}
+    except Exception as e:
+        if not quiet:
+            print(f"{database_system} Error: {e}")
+        return None
+    
+    if not quiet:
+        print(f"{database_system} Result: {len(rows)} of {len(keys)} records found")
+    log_get_operations(LOG_MAP[database_system], requested)
+    return rows
+
+# Functions that write many grades to each database system at once
+SET_MANY = {
+    'MongoDB': set_many_mongo,
+    'MySQL': set_many_mysql,
+    'Hive': set_many_hive
+}
+
+def set_many(database_system, updates, quiet=False):
+    """Write many ((student_id, course_id), grade) updates to one system and return {key: matched}.
+
+    All updates are written with one batched call. When a key repeats, only its last grade is versioned, written and
+    logged, since it would overwrite the earlier ones anyway. Keys the key filter rules out are not sent. The SETs are logged in one write.
+    Returns None if the write failed. quiet=True leaves printing the results, and the error of a failed write, to the caller.
+    """
+    grades = {}
+    for key, grade in updates:
+        grades.pop(tuple(key), None)
+        grades[tuple(key)] = grade
+    if not grades:
+        return {}
+    versions = next_origin_seqs(database_system, len(grades))
+    latest = {key: (grade, version) for (key, grade), version in zip(grades.items(), versions)}
+    
+    write_behind = database_system == 'Hive' and HIVE_WRITE_BEHIND
+    try:
+        writes = {key: update for key, update in latest.items() if key_may_exist(database_system, key)}
+        if write_behind:
+            # Logs every SET before queueing the ones the key filter lets through
+            matched = queue_hive_writes(latest, writes)
+        else:
+            matched = SET_MANY[database_system](writes) if writes else set()
+        cache_invalidate(database_system, writes)
+    except Exception as e:
+        if not quiet:
+            print(f"{database_system} Error: {e}")
+        return None
+    
+    if not quiet:
+        print(f"{database_system} Result: {len(matched)} of {len(latest)} grades updated")
+    if not write_behind:
+        log_set_operations(LOG_MAP[database_system], grades.items(), versions)
+    return {key: key in matched for key in latest}
+
+def scan_rows_mongo(field, value):
+    """Yield the MongoDB rows whose field ('student-ID' or 'course-id') equals value, SCAN_BATCH_SIZE per round trip."""
+    client = MongoClient('mongodb://localhost:27017/')
+    try:
+        collection = client['university_db']['student_course_grades']
+        for doc in collection.find({field: value}, MONGO_ROW_PROJECTION).batch_size(SCAN_BATCH_SIZE):
+            yield doc
+    finally:
+        client.close()
+
+def scan_rows_mysql(column, value):
+    """Yield the MySQL rows whose column ('student_id' or 'course_id') equals value from an unbuffered cursor."""
+    # A dedicated connection: closing it drops any rows left unread if the caller stops early
+    conn = mysql.connector.connect(
+        host='localhost',
+        user='root',
+        password='admin',
+        database='university_db'
+    )
+    try:
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        cursor.execute("""
+        SELECT student_id, course_id, roll_no, email_id, grade
+        FROM student_course_grades
+        WHERE %s = %%s
+        """ % column, (value,))
+        while True:
+            rows = cursor.fetchmany(SCAN_BATCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+def scan_rows_hive(column, value):
+    """Yield the Hive rows whose column ('student_id' or 'course_id') equals value, SCAN_BATCH_SIZE per fetch."""
+    flush_hive_writes()
+    conn = hive.connect(host='localhost', port=10000, database='default')
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+        SELECT student_id, course_id, roll_no, email_id, grade
+        FROM student_course_grades
+        WHERE %s = '%s'
+        """ % (column, value))
+        while True:
+            rows = cursor.fetchmany(SCAN_BATCH_SIZE)
+            if not rows:
+                break
+            for student_id, course_id, roll_no, email_id, grade in rows:
+                yield {'student_id': student_id, 'course_id': course_id, 'roll_no': roll_no,
+                       'email_id': email_id, 'grade': grade}
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+# Functions that stream rows matching one key column, and each system's (student, course) column names
+SCAN_ROWS = {
+    'MongoDB': scan_rows_mongo,
+    'MySQL': scan_rows_mysql,
+    'Hive': scan_rows_hive
+}
+KEY_COLUMNS = {
+    'MongoDB': ('student-ID', 'course-id'),
+    'MySQL': ('student_id', 'course_id'),
+    'Hive': ('student_id', 'course_id')
+}
+
+def scan_by_student(database_system, student_id):
+    """Return a generator of every row of a student (their transcript) in the given system."""
+    return SCAN_ROWS[database_system](KEY_COLUMNS[database_system][0], student_id)
+
+def scan_by_course(database_system, course_id):
+    """Return a generator of every row of a course (its roster) in the given system."""
+    return SCAN_ROWS[database_system](KEY_COLUMNS[database_system][1], course_id)
+
+def grade_histogram_mongo(course_id=None):
+    """Return {course_id: {grade: count}} from a MongoDB aggregation pipeline, for one course or all of them."""
+    client = MongoClient('mongodb://localhost:27017/')
+    try:
+        collection = client['university_db']['student_course_grades']
+        
+        pipeline = [{'$group': {'_id': {'course': '$course-id', 'grade': '$grade'}, 'count': {'$sum': 1}}}]
+        if course_id is not None:
+            pipeline.insert(0, {'$match': {'course-id': course_id}})
+        histograms = {}
+        for doc in collection.aggregate(pipeline):
+            histograms.setdefault(doc['_id']['course'], {})[doc['_id'].get('grade')] = doc['count']
+        return histograms
+    finally:
+        client.close()
+
+def course_counts_mongo(student_id=None):
+    """Return {student_id: number of courses} from a MongoDB aggregation pipeline, for one student or all of them."""
+    client = MongoClient('mongodb://localhost:27017/')
+    try:
+        collection = client['university_db']['student_course_grades']
+        
+        pipeline = [{'$group': {'_id': '$student-ID', 'count': {'$sum': 1}}}]
+        if student_id is not None:
+            pipeline.insert(0, {'$match': {'student-ID': student_id}})
+        return {doc['_id']: doc['count'] for doc in collection.aggregate(pipeline)}
+    finally:
+        client.close()
+
+def grade_histogram_mysql(course_id=None):
+    """Return {course_id: {grade: count}} aggregated by MySQL, for one course or all of them."""
+    conn = get_mysql_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        
+        query = """
+        SELECT course_id, grade, COUNT(*)
+        FROM student_course_grades
+        %s
+        GROUP BY course_id, grade
+        """ % ('WHERE course_id = %s' if course_id is not None else '')
+        cursor.execute(query, (course_id,) if course_id is not None else ())
+        histograms = {}
+        for course, grade, count in cursor.fetchall():
+            histograms.setdefault(course, {})[grade] = int(count)
+        return histograms
+    finally:
+        if cursor:
+            cursor.close()
+        close_mysql_connection(conn)
+
+def course_counts_mysql(student_id=None):
+    """Return {student_id: number of courses} aggregated by MySQL, for one student or all of them."""
+    conn = get_mysql_connection()
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        
+        query = """
+        SELECT student_id, COUNT(*)
+        FROM student_course_grades
+        %s
+        GROUP BY student_id
+        """ % ('WHERE student_id = %s' if student_id is not None else '')
+        cursor.execute(query, (student_id,) if student_id is not None else ())
+        return {student: int(count) for student, count in cursor.fetchall()}
+    finally:
+        if cursor:
+            cursor.close()
+        close_mysql_connection(conn)
+
+def grade_histogram_hive(course_id=None):
+    """Return {course_id: {grade: count}} aggregated by Hive, for one course or all of them."""
+    flush_hive_writes()
+    conn = hive.connect(host='localhost', port=10000, database='default')
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        
+        query = """
+        SELECT course_id, grade, COUNT(*)
+        FROM student_course_grades
+        %s
+        GROUP BY course_id, grade
+        """ % ("WHERE course_id = '%s'" % course_id if course_id is not None else '')
+        cursor.execute(query)
+        histograms = {}
+        for course, grade, count in cursor.fetchall():
+            histograms.setdefault(course, {})[grade] = int(count)
+        return histograms
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def course_counts_hive(student_id=None):
+    """Return {student_id: number of courses} aggregated by Hive, for one student or all of them."""
+    flush_hive_writes()
+    conn = hive.connect(host='localhost', port=10000, database='default')
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        
+        query = """
+        SELECT student_id, COUNT(*)
+        FROM student_course_grades
+        %s
+        GROUP BY student_id
+        """ % ("WHERE student_id = '%s'" % student_id if student_id is not None else '')
+        cursor.execute(query)
+        return {student: int(count) for student, count in cursor.fetchall()}
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+# Functions that aggregate grades per course and courses per student in each database system
+GRADE_HISTOGRAM = {
+    'MongoDB': grade_histogram_mongo,
+    'MySQL': grade_histogram_mysql,
+    'Hive': grade_histogram_hive
+}
+COURSE_COUNTS = {
+    'MongoDB': course_counts_mongo,
+    'MySQL': course_counts_mysql,
+    'Hive': course_counts_hive
+}
+
+def compare_histograms(systems=None, course_id=None):
+    """Compare the per-course grade histograms of the given systems (all three by default), aggregated concurrently.
+
+    Only the histograms cross the wire, so this is a cheap consistency check before a full VERIFY. Matching
+    histograms do not prove the rows match (two swapped grades cancel out). Returns {course_id: {system: histogram}}
+    for the courses whose histograms differ, or None on error.
+    """
+    systems = list(systems or LOG_MAP)
+    try:
+        with ThreadPoolExecutor(max_workers=len(systems)) as executor:
+            futures = {system: executor.submit(GRADE_HISTOGRAM[system], course_id) for system in systems}
+            histograms = {system: future.result() for system, future in futures.items()}
+        
+        differences = {}
+        for course in sorted(set().union(*histograms.values())):
+            per_system = {system: histograms[system].get(course, {}) for system in systems}
+            if any(histogram != per_system[systems[0]] for histogram in per_system.values()):
+                differences[course] = per_system
+                print(f"Course {course} differs: " + ", ".join(f"{system}={per_system[system]}" for system in systems))
+        
+        print(f"{', '.join(systems)}: {len(differences)} of {len(set().union(*histograms.values()))} course histograms differ.")
+        return differences
+    
+    except Exception as e:
+        print(f"Compare Error: {e}")
+        return None
+
+# Functions that look up a single key in each database system
+GET_FUNCTIONS = {
+    'MongoDB': get_mongo,
+    'MySQL': get_mysql,
+    'Hive': get_hive
+}
+
+# Functions that read one row from each database system without printing or logging
+FETCH_ROW = {
+    'MongoDB': fetch_row_mongo,
+    'MySQL': fetch_row_mysql,
+    'Hive': fetch_row_hive
+}
+
+def fetch_row(system, key):
+    """Return the row for a (student_id, course_id) key from one system, or None, without printing or logging the GET.
+
+    The lookup goes through the GET cache, the key filter, the Hive snapshot and the write-behind overlay as the system's GET does.
+    """
+    hit, row = cache_lookup(system, key)
+    if not hit:
+        if not key_may_exist(system, key):
+            return None
+        snapshot_rows = None
+        if system == 'Hive' and HIVE_SNAPSHOT:
+            try:
+                snapshot_rows = snapshot_get_many_hive([key])
+            except Exception as e:
+                print(f"Hive Snapshot Error: {e}")
+        row = snapshot_rows.get(key) if snapshot_rows is not None else FETCH_ROW[system](*key)
+        if row:
+            cache_store(system, key, row)
+    return overlay_hive_row(key, row) if system == 'Hive' else row
+
+def refresh_write_index():
+    """Read the SET records appended to each log since the last call into WRITE_INDEX."""
+    with WRITE_INDEX_LOCK:
+        for system, log_file in LOG_MAP.items():
+            index = WRITE_INDEX[system]
+            size = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+            if size < index['offset']:
+                # The log was truncated or replaced: index it again
+                index['offset'] = 0
+                index['versions'] = {}
+            if size == index['offset']:
+                continue
+            with open(log_file, 'rb') as f:
+                f.seek(index['offset'])
+                data = f.read(size - index['offset'])
+            # Only complete lines are indexed
+            end = data.rfind(b'\n') + 1
+            versions = index['versions']
+            for line in data[:end].decode().split('\n'):
+                record = parse_set_line(line.strip())
+                if record:
+                    timestamp, key, grade, origin = record
+                    versions[key] = max(versions.get(key, 0), version_of(timestamp, origin))
+            index['offset'] += end
+        prune_write_index()
+
+def prune_write_index():
+    """Drop the keys every system holds at the same version from WRITE_INDEX once it passes WRITE_INDEX_PRUNE_AT entries.
+
+    All systems are up to date for such a key, as for a key never set, and a later SET indexes it again.
+    Call with WRITE_INDEX_LOCK held.
+    """
+    global WRITE_INDEX_PRUNE_AT
+    all_versions = [WRITE_INDEX[system]['versions'] for system in LOG_MAP]
+    if sum(len(versions) for versions in all_versions) <= WRITE_INDEX_PRUNE_AT:
+        return
+    converged = [key for key in all_versions[0]
+                 if all(versions.get(key) == all_versions[0][key] for versions in all_versions[1:])]
+    for versions in all_versions:
+        for key in converged:
+            del versions[key]
+    WRITE_INDEX_PRUNE_AT = max(WRITE_INDEX_MAX_KEYS, 2 * sum(len(versions) for versions in all_versions))
+
+def fresh_systems(key):
+    """Return the systems that have applied the newest logged SET for a (student_id, course_id) key.
+
+    Every SET and merged update a system applies is logged in its own log with its version, so a system is
+    up to date when its log holds the newest version of the key found in any log. A key never set is up to date everywhere.
+    """
+    refresh_write_index()
+    versions = {system: WRITE_INDEX[system]['versions'].get(key, 0) for system in LOG_MAP}
+    newest = max(versions.values())
+    return [system for system, version in versions.items() if version >= newest]
+
+def record_get_latency(system, seconds):
+    """Record the latency of a GET served by the given system."""
+    GET_LATENCIES[system].append(seconds)
+
+def expected_get_latency(system):
+    """Return the median recent GET latency of a system, or its prior before any GET was timed."""
+    samples = sorted(GET_LATENCIES[system])
+    if not samples:
+        return GET_LATENCY_PRIORS[system]
+    return samples[len(samples) // 2]
+
+def routed_get(student_id, course_id):
+    """Retrieve a row from the fastest system that has applied the newest SET for the key.
+
+    Returns (system, row).
+    """
+    fresh = fresh_systems((student_id, course_id))
+    system = min(fresh, key=expected_get_latency)
+    print(f"Routing GET to {system} (up to date: {', '.join(fresh)})")
+    start = time.perf_counter()
+    result = GET_FUNCTIONS[system](student_id, course_id)
+    record_get_latency(system, time.perf_counter() - start)
+    return system, result
+
+def latency_percentile(system, percentile):
+    """Return the given percentile of a system's recent GET latencies, or its prior before any GET was timed."""
+    samples = sorted(GET_LATENCIES[system])
+    if not samples:
+        return GET_LATENCY_PRIORS[system]
+    return samples[min(len(samples) - 1, len(samples) * percentile // 100)]
+
+def hedged_get(student_id, course_id):
+    """Retrieve a row from the fastest up-to-date system, hedging with a read from the next one if it is slow.
+
+    The backup read starts once the first has run past GET_HEDGE_PERCENTILE of its recent latencies, so only
+    the slowest reads are duplicated. Both reads are silent (fetch_row): the first row found wins and only the
+    winner's result is printed and its GET logged; the other read is ignored. Returns (system, row).
+    """
+    key = (student_id, course_id)
+    fresh = sorted(fresh_systems(key), key=expected_get_latency)
+    primary = fresh[0]
+    backup = fresh[1] if len(fresh) > 1 else None
+    with HEDGE_STATS_LOCK:
+        HEDGE_STATS['gets'] += 1
+    
+    def timed_fetch(system):
+        start = time.perf_counter()
+        result = fetch_row(system, key)
+        record_get_latency(system, time.perf_counter() - start)
+        return result
+    
+    futures = {HEDGE_EXECUTOR.submit(timed_fetch, primary): primary}
+    delay = latency_percentile(primary, GET_HEDGE_PERCENTILE)
+    done, pending = wait(futures, timeout=delay)
+    if not done and backup is not None:
+        with HEDGE_STATS_LOCK:
+            HEDGE_STATS['hedged'] += 1
+        print(f"Hedging GET to {backup} after {delay * 1000:.0f}ms on {primary}")
+        futures[HEDGE_EXECUTOR.submit(timed_fetch, backup)] = backup
+    
+    # Take the first read that finds the row; a miss only counts once both reads are in
+    winner, result = primary, None
+    pending = set(futures)
+    while pending and result is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                row = future.result()
+            except Exception as e:
+                print(f"{futures[future]} Error: {e}")
+                continue
+            if row is not None:
+                winner, result = futures[future], row
+                break
+    for future in pending:
+        future.cancel()
+    
+    if result:
+        print(f"{winner} Result:", result)
+    else:
+        print(not_found_message(winner, student_id, course_id))
+    log_operation(LOG_MAP[winner], 'GET', student_id, course_id)
+    if winner != primary:
+        with HEDGE_STATS_LOCK:
+            HEDGE_STATS['backup_wins'] += 1
+    return winner, result
+
+def get_hedge_stats():
+    """Return the hedged GET counts with the hedge rate and the share of hedges the backup won."""
+    with HEDGE_STATS_LOCK:
+        stats = dict(HEDGE_STATS)
+    stats['hedge_rate'] = stats['hedged'] / stats['gets'] if stats['gets'] else 0.0
+    stats['backup_win_rate'] = stats['backup_wins'] / stats['hedged'] if stats['hedged'] else 0.0
+    return stats
+
+def key_shard(key, shards):
+    """Return the shard (0..shards-1) of a (student_id, course_id) key; stable across runs and processes."""
+    return zlib.crc32(row_digest_fields(*key).encode()) % shards
+
+def apply_updates_sharded(database_system, updates, shards=None):
+    """Apply updates to MongoDB or MySQL on several concurrent connections, one per key-hash shard.
+
+    Every key goes to the same shard and each shard applies its updates in arrival order, so per-key order is kept.
+    Hive, or shards <= 1 (default MERGE_APPLY_SHARDS), applies on a single connection. Keys the key filter
+    rules out are not sent. Returns the summed (applied, skipped, missing) counts.
+    """
+    if shards is None:
+        shards = MERGE_APPLY_SHARDS
+    apply_updates = APPLY_UPDATES[database_system]
+    
+    # Keys the key filter rules out are counted as missing without a lookup
+    filtered_count = 0
+    def known(updates):
+        nonlocal filtered_count
+        for key, value in updates:
+            if key_may_exist(database_system, key):
+                yield key, value
+            else:
+                filtered_count += 1
+    updates = known(updates)
+    
+    if shards <= 1 or database_system == 'Hive':
+        applied_count, skipped_count, missing_count = apply_updates(updates)
+        return applied_count, skipped_count, missing_count + filtered_count
+    
+    shard_queues = [queue.Queue(maxsize=MERGE_PIPELINE_QUEUE_SIZE) for _ in range(shards)]
+    
+    def drain(shard_queue):
+        while True:
+            batch = shard_queue.get()
+            if batch is None:
+                return
+            yield from batch
+    
+    with ThreadPoolExecutor(max_workers=shards) as executor:
+        futures = [executor.submit(apply_updates, drain(shard_queue)) for shard_queue in shard_queues]
+        
+        def put_batch(shard, batch):
+            # Wait for room in the shard queue; False if its worker already exited (it failed)
+            while True:
+                try:
+                    shard_queues[shard].put(batch, timeout=1)
+                    return True
+                except queue.Full:
+                    if futures[shard].done():
+                        return False
+        
+        def produce():
+            pending = [[] for _ in range(shards)]
+            for key, value in updates:
+                shard = key_shard(key, shards)
+                pending[shard].append((key, value))
+                if len(pending[shard]) >= MERGE_BATCH_SIZE:
+                    if not put_batch(shard, pending[shard]):
+                        return
+                    pending[shard] = []
+            for shard, batch in enumerate(pending):
+                if batch and not put_batch(shard, batch):
+                    return
+        
+        try:
+            produce()
+        finally:
+            # Every shard gets its sentinel, even after a failure, so the pool can shut down
+            for shard in range(shards):
+                put_batch(shard, None)
+    
+    # The pool has joined every worker: re-raise the first worker error
+    for future in futures:
+        if future.exception() is not None:
+            raise future.exception()
+    counts = [future.result() for future in futures]
+    
+    applied_count, skipped_count, missing_count = (sum(shard_counts[i] for shard_counts in counts) for i in range(3))
+    return applied_count, skipped_count, missing_count + filtered_count
+
+def write_merge_journal(journal_file, local_db, remote_dbs, updates, checkpoints):
+    """Write the planned winners of a merge and its checkpoints to a journal, atomically and durably.
+
+    Update lines are [student_id, course_id, grade, timestamp, origin]; the header follows them because
+    a pipelined merge only fills its checkpoints once its updates have been read.
+    """
+    tmp_file = journal_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        for (student_id, course_id), (grade, timestamp, origin) in updates:
+            f.write(json.dumps([student_id, course_id, grade, timestamp.isoformat(sep=' '), origin]) + '\n')
+        header = {'local_db': local_db, 'remote_dbs': remote_dbs, 'checkpoints': checkpoints,
+                  'batch_size': MERGE_JOURNAL_BATCH_SIZE}
+        f.write(json.dumps(header) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, journal_file)
+
+def read_merge_journal(journal_file):
+    """Return the header of a merge journal and the number of batches already applied."""
+    header = None
+    done = 0
+    with open(journal_file, 'r') as f:
+        for line in f:
+            if line.startswith('{'):
+                record = json.loads(line)
+                if 'done' in record:
+                    done = max(done, record['done'])
+                else:
+                    header = record
+    return header, done
+
+def iter_merge_journal(journal_file):
+    """Yield the planned ((student_id, course_id), (grade, timestamp, origin)) updates of a merge journal."""
+    with open(journal_file, 'r') as f:
+        for line in f:
+            if line.startswith('['):
+                student_id, course_id, grade, timestamp, origin = json.loads(line)
+                yield (student_id, course_id), (grade, datetime.fromisoformat(timestamp), tuple(origin) if origin else None)
+
+def apply_merge_journal(journal_file):
+    """Apply the batches of a merge journal not applied yet, then log its checkpoints and remove it.
+
+    Each applied batch is recorded durably, so a crash costs at most one batch of rework; reapplying
+    a batch is harmless since keys already at the update's version are skipped.
+    Returns the summed (applied, skipped, missing) counts of the batches applied now.
+    """
+    header, done = read_merge_journal(journal_file)
+    counts = (0, 0, 0)
+    for index, batch in enumerate(batched(iter_merge_journal(journal_file), header['batch_size']), 1):
+        if index <= done:
+            continue
+        batch_counts = apply_updates_sharded(header['local_db'], batch)
+        counts = tuple(total + count for total, count in zip(counts, batch_counts))
+        with open(journal_file, 'a') as f:
+            f.write(json.dumps({'done': index}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+    log_merge_operations([tuple(checkpoint) for checkpoint in header['checkpoints']])
+    os.remove(journal_file)
+    return counts
+
+def resume_merge_journal(local_db):
+    """Finish an interrupted journaled merge into local_db, if there is one, so its checkpoints are logged first."""
+    journal_file = MERGE_JOURNAL_FILE.format(local_db)
+    if os.path.exists(journal_file):
+        header, done = read_merge_journal(journal_file)
+        print(f"Resuming interrupted merge into {local_db} from {', '.join(header['remote_dbs'])} after {done} batches.")
+        applied_count, skipped_count, missing_count = apply_merge_journal(journal_file)
+        print(f"Debug: {applied_count} applied, {skipped_count} already up to date, {missing_count} missing")
+
+def apply_merge(local_db, remote_dbs):
+    """Load and apply the remote winners for local_db, then advance its checkpoints with remote_dbs.
+
+    An interrupted journaled merge into local_db is finished first. With MERGE_JOURNAL the winners are
+    journaled before they are applied. Returns the (applied, skipped, missing) counts, or None if there were no updates.
+    """
+    journal_file = MERGE_JOURNAL_FILE.format(local_db)
+    resume_merge_journal(local_db)
+    
+    updates, checkpoints = load_merge_updates(local_db, remote_dbs)
+    
+    if not updates:
+        log_merge_operations(checkpoints)
+        return None
+    
+    if MERGE_JOURNAL:
+        write_merge_journal(journal_file, local_db, remote_dbs, updates, checkpoints)
+        return apply_merge_journal(journal_file)
+    
+    counts = apply_updates_sharded(local_db, updates)
+    log_merge_operations(checkpoints)
+    return counts
+
+def merge_multi(database_system, remote_systems):
+    """Merge one system with several others in one pass: one LWW winner set, one apply and one checkpoint write."""
+    try:
+        if database_system not in LOG_MAP or any(remote not in LOG_MAP for remote in remote_systems):
+            print(f"Invalid database system in {database_system}, {remote_systems}. Choose MongoDB, MySQL, or Hive.")
+            return False
+        
+        if database_system in remote_systems:
+            print(f"Cannot merge {database_system} with itself.")
+            return False
+        
+        if len(set(remote_systems)) != len(remote_systems):
+            print(f"Duplicate remote systems in {remote_systems}.")
+            return False
+        
+        # Apply the merged updates and advance the checkpoints
+        counts = apply_merge(database_system, remote_systems)
+        
+        if counts is None:
+            print("No updates to merge.")
+            return False
+        
+        applied_count, skipped_count, missing_count = counts
+        
+        print(f"Merged {applied_count} records into {database_system} from {', '.join(remote_systems)}.")
+        print(f"Debug: {applied_count} applied, {skipped_count} already up to date, {missing_count} missing")
+        return applied_count > 0
+    
+    except Exception as e:
+        print(f"{database_system} Merge Error: {e}")
+        return False
+
+def merge_fanout(source_system, target_systems):
+    """Merge one system into several targets concurrently, one worker and connection per target.
+
+    Each target runs its own merge_multi, so its LWW winners and pair checkpoint stay independent of the others
+    and the total time is that of the slowest target. Returns {target: merged_anything}.
+    """
+    if source_system not in LOG_MAP or any(target not in LOG_MAP for target in target_systems):
+        print(f"Invalid database system in {source_system}, {target_systems}. Choose MongoDB, MySQL, or Hive.")
+        return {}
+    
+    if source_system in target_systems:
+        print(f"Cannot merge {source_system} with itself.")
+        return {}
+    
+    if len(set(target_systems)) != len(target_systems):
+        print(f"Duplicate target systems in {target_systems}.")
+        return {}
+    
+    def merge_target(target):
+        start = time.perf_counter()
+        merged = merge_multi(target, [source_system])
+        return merged, time.perf_counter() - start
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=MERGE_FANOUT_WORKERS or len(target_systems)) as executor:
+        futures = {target: executor.submit(merge_target, target) for target in target_systems}
+        results = {target: future.result() for target, future in futures.items()}
+    
+    for target, (merged, elapsed) in results.items():
+        print(f"Debug: {source_system} -> {target} finished in {elapsed:.2f}s")
+    print(f"Fan-out merge from {source_system} finished in {time.perf_counter() - start:.2f}s.")
+    return {target: merged for target, (merged, elapsed) in results.items()}
+
+def merge_all():
+    """Bring all three systems to the global last-writer-wins state in one pass.
+
+    Every log is read once from the oldest checkpoint that involves it, the winner per key is the record with the
+    newest version across all logs, and each system is sent only the winners it did not write or already see, in
+    one apply per system (run concurrently). All six pair checkpoints are then advanced in a single write.
+    Interrupted journaled merges are finished before the checkpoints are read. With MERGE_JOURNAL each system's
+    winners are journaled with its two checkpoints, which are logged once its apply completes, as in apply_merge.
+    Returns {system: (applied, skipped, missing)}.
+    """
+    systems = list(LOG_MAP)
+    for system in systems:
+        resume_merge_journal(system)
+    checkpoints = {(local_db, remote_db): read_merge_checkpoint(local_db, remote_db)
+                   for local_db in systems for remote_db in systems if local_db != remote_db}
+    
+    workers = MERGE_PARSE_WORKERS
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    winners = {}
+    total_lines = {}
+    # Newest own-origin tag read from each system's log
+    read_seqs = {}
+    try:
+        for system in systems:
+            offset = min([local for (local_db, remote_db), (local, remote, seq) in checkpoints.items() if local_db == system] +
+                         [remote for (local_db, remote_db), (local, remote, seq) in checkpoints.items() if remote_db == system])
+            total_lines[system] = 0
+            set_count = 0
+            if os.path.exists(LOG_MAP[system]):
+                latest, set_count, total_lines[system], origin_seqs = read_log_updates(LOG_MAP[system], offset, executor)
+                read_seqs[system] = origin_seqs.get(system, 0)
+                for key, (timestamp, grade, origin) in latest.items():
+                    version = version_of(timestamp, origin)
+                    # Newest version wins; the first log read wins ties
+                    if key not in winners or version > winners[key][0]:
+                        winners[key] = (version, grade, timestamp, origin, system)
+            else:
+                print(f"Warning: Log file {LOG_MAP[system]} does not exist.")
+            print(f"Debug: Found {set_count} SET operations in {LOG_MAP[system]} after offset {offset}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    # Per system, the winners it did not write
+    diffs = {}
+    for system in systems:
+        diffs[system] = [(key, (grade, timestamp, origin))
+                         for key, (version, grade, timestamp, origin, source) in winners.items()
+                         if source != system and not origin_already_seen(origin, system)]
+        print(f"Debug: {len(diffs[system])} of {len(winners)} winners to apply to {system}")
+    
+    new_checkpoints = {system: [(local_db, remote_db, total_lines[local_db], total_lines[remote_db],
+                                 max(checkpoints[(local_db, remote_db)][2], read_seqs.get(remote_db, 0)))
+                                for local_db, remote_db in checkpoints if local_db == system]
+                       for system in systems}
+    journaled = [system for system in systems if MERGE_JOURNAL and diffs[system]]
+    
+    def apply_system(system):
+        if system not in journaled:
+            return apply_updates_sharded(system, iter(diffs[system]))
+        journal_file = MERGE_JOURNAL_FILE.format(system)
+        write_merge_journal(journal_file, system, [remote_db for remote_db in systems if remote_db != system],
+                            diffs[system], new_checkpoints[system])
+        return apply_merge_journal(journal_file)
+    
+    with ThreadPoolExecutor(max_workers=len(systems)) as pool:
+        futures = {system: pool.submit(apply_system, system) for system in systems if diffs[system]}
+        results = {system: future.result() for system, future in futures.items()}
+    
+    # Journaled systems logged their checkpoints when their journals completed
+    log_merge_operations([checkpoint for system in systems if system not in journaled
+                          for checkpoint in new_checkpoints[system]])
+    
+    for system in systems:
+        applied_count, skipped_count, missing_count = results.get(system, (0, 0, 0))
+        print(f"Merged {applied_count} records into {system}.")
+        print(f"Debug: {applied_count} applied, {skipped_count} already up to date, {missing_count} missing")
+    return {system: results.get(system, (0, 0, 0)) for system in systems}
+
+def scan_versions_mongo(min_version):
+    """Yield ((student_id, course_id), grade, version) for MongoDB rows whose version is above min_version."""
+    client = MongoClient('mongodb://localhost:27017/')
+    try:
+        db = client['university_db']
+        collection = db['student_course_grades']
+        
+        query = {'version': {'$gt': min_version}}
+        projection = {'_id': 0, 'student-ID': 1, 'course-id': 1, 'grade': 1, 'version': 1}
+        for doc in collection.find(query, projection).batch_size(MERGE_BATCH_SIZE):
+            yield (doc['student-ID'], doc['course-id']), doc.get('grade'), doc['version']
+    finally:
+        client.close()
+
+def scan_versions_mysql(min_version):
+    """Yield ((student_id, course_id), grade, version) for MySQL rows whose version is above min_version."""
+    conn = mysql.connector.connect(
+        host='localhost',
+        user='root',
+        password='admin',
+        database='university_db'
+    )
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        
+        query = """
+        SELECT student_id, course_id, grade, version
+        FROM student_course_grades
+        WHERE version > %s
+        """
+        cursor.execute(query, (min_version,))
+        for rows in iter(lambda: cursor.fetchmany(MERGE_BATCH_SIZE), []):
+            for student_id, course_id, grade, version in rows:
+                yield (student_id, course_id), grade, version
     finally:
         if cursor:
             cursor.close()
-        if conn and conn.is_connected():
+        if conn.is_connected():
             conn.close()
 
-def set_mysql(student_id, course_id, new_grade):
-    """Update the grade in MySQL for the given student_id and course_id."""
+def scan_versions_hive(min_version):
+    """Yield ((student_id, course_id), grade, version) for Hive rows whose version is above min_version."""
+    flush_hive_writes()
+    conn = hive.connect(host='localhost', port=10000, database='default')
+    cursor = None
     try:
-        conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='admin',
-            database='university_db'
-        )
         cursor = conn.cursor()
         
         query = """
-        UPDATE student_course_grades
-        SET grade = %s
-        WHERE student_id = %s AND course_id = %s
+        SELECT student_id, course_id, grade, version
+        FROM student_course_grades
+        WHERE version > %d
         """
-        cursor.execute(query, (new_grade, student_id, course_id))
-        conn.commit()
-        
-        if cursor.rowcount > 0:
-            print(f"Grade updated to {new_grade} in MySQL for student_id: {student_id}, course_id: {course_id}")
-        else:
-            print(f"No record found in MySQL for student_id: {student_id}, course_id: {course_id}")
-        
-        log_operation(MYSQL_LOG, 'SET', student_id, course_id, new_grade)
-        return cursor.rowcount > 0
-    
-    except Exception as e:
-        print(f"MySQL Error: {e}")
-        return False
+        cursor.execute(query % min_version)
+        for rows in iter(lambda: cursor.fetchmany(MERGE_BATCH_SIZE), []):
+            for student_id, course_id, grade, version in rows:
+                yield (student_id, course_id), grade, version
     finally:
         if cursor:
             cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
+        conn.close()
 
-def merge_mysql(database_system):
-    """Merge MySQL with the state of another system based on operation logs."""
-    conn = None
-    cursor = None
+# Functions that read rows above a version from each database system
+SCAN_VERSIONS = {
+    'MongoDB': scan_versions_mongo,
+    'MySQL': scan_versions_mysql,
+    'Hive': scan_versions_hive
+}
+
+def log_sync_operation(local_db, remote_db, frontier):
+    """Log the version frontier ({origin: version}) of remote_db rows that local_db has pulled."""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    log_entry = f"{timestamp} - SYNC ({local_db}, {remote_db}) {json.dumps(frontier, sort_keys=True)}\n"
+    with open(MERGE_LOG, 'a') as f:
+        f.write(log_entry)
+
+def get_sync_frontier(local_db, remote_db):
+    """Retrieve the last version frontier ({origin: version}) that local_db pulled from remote_db."""
+    if not os.path.exists(MERGE_LOG):
+        return {}
+    
+    # Regex to match sync log entries: YYYY-MM-DD HH:MM:SS - SYNC (local_db, remote_db) {frontier}
+    sync_pattern = r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} - SYNC \(([^,]+), ([^)]+)\) (\{.*\})'
+    frontier = {}
+    with open(MERGE_LOG, 'r') as f:
+        for line in f:
+            match = re.match(sync_pattern, line.strip())
+            if match and match.group(1) == local_db and match.group(2) == remote_db:
+                frontier = json.loads(match.group(3))
+    return frontier
+
+def sync_versions(database_system, remote_system):
+    """Pull the rows of remote_system whose versions are past the local frontier straight from the store, without reading logs.
+
+    The frontier keeps the highest version pulled per origin backend, so each run reads only the delta.
+    A row that reaches remote_system late with an older version than the frontier is not pulled.
+    """
     try:
-        # Map database system to log file
-        log_map = {
-            'MongoDB': MONGO_LOG,
-            'MySQL': MYSQL_LOG,
-            'Hive': HIVE_LOG
-        }
-        
-        if database_system not in log_map:
-            print(f"Invalid database system: {database_system}. Choose MongoDB, MySQL, or Hive.")
-            return False
-        
-        if database_system == 'MySQL':
-            print("Cannot merge MySQL with itself.")
+        if database_system not in LOG_MAP or remote_system not in LOG_MAP:
+            print(f"Invalid database system: {database_system} or {remote_system}. Choose MongoDB, MySQL, or Hive.")
             return False
         
-        local_log = MYSQL_LOG
-        remote_log = log_map[database_system]
-        
-        # Get merged updates and total log lines
-        updates, total_local_lines, total_remote_lines = merge_logs(local_log, remote_log, 'MySQL', database_system)
-        
-        if not updates:
-            print("No updates to merge.")
-            log_merge_operation('MySQL', database_system, total_local_lines, total_remote_lines)
+        if database_system == remote_system:
+            print(f"Cannot sync {database_system} with itself.")
             return False
         
-        # Connect to MySQL
-        conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='admin',
-            database='university_db'
-        )
-        cursor = conn.cursor()
+        frontier = get_sync_frontier(database_system, remote_system)
+        new_frontier = dict(frontier)
+        # Rows are fetched from the lowest per-origin frontier and filtered per origin;
+        # origins not pulled before start from that lowest frontier too
+        min_version = min(frontier.values()) if frontier else 0
         
-        # Apply updates
-        updated_count = 0
-        query = """
-        UPDATE student_course_grades
-        SET grade = %s
-        WHERE student_id = %s AND course_id = %s
-        """
-        for (student_id, course_id), (grade, timestamp) in updates.items():
-            cursor.execute(query, (grade, student_id, course_id))
-            if cursor.rowcount > 0:
-                updated_count += 1
-                complete_log_operation(MYSQL_LOG, 'SET', student_id, course_id, timestamp, grade)
+        def delta():
+            for key, grade, version in SCAN_VERSIONS[remote_system](min_version):
+                origin = version_origin(version)
+                if version <= frontier.get(origin, min_version):
+                    continue
+                new_frontier[origin] = max(new_frontier.get(origin, 0), version)
+                yield key, (grade, version_timestamp(version), (origin, version))
         
-        conn.commit()
+        applied_count, skipped_count, missing_count = apply_updates_sharded(database_system, delta())
         
-        # Log the merge operation
-        log_merge_operation('MySQL', database_system, total_local_lines, total_remote_lines)
+        log_sync_operation(database_system, remote_system, new_frontier)
         
-        print(f"Merged {updated_count} records into MySQL from {database_system}.")
-        return updated_count > 0
+        print(f"Synced {applied_count} records into {database_system} from {remote_system}.")
+        print(f"Debug: {applied_count} applied, {skipped_count} already up to date, {missing_count} missing")
+        return applied_count > 0
     
     except Exception as e:
-        print(f"MySQL Merge Error: {e}")
+        print(f"{database_system} Sync Error: {e}")
         return False
+
+def row_digest_fields(*values):
+    """Join the non-NULL values with '|', like CONCAT_WS in MySQL and Hive."""
+    return '|'.join(str(value) for value in values if value is not None)
+
+def mongo_digest_fields(student_id, course_id, grade):
+    """Return the key_crc and row_crc fields stored with a MongoDB row, the CRC32s MySQL and Hive compute in SQL.
+
+    MongoDB's aggregation pipeline has no CRC32, so every write stores them and the digests group on them server-side.
+    """
+    return {'key_crc': zlib.crc32(row_digest_fields(student_id, course_id).encode()),
+            'row_crc': zlib.crc32(row_digest_fields(student_id, course_id, grade).encode())}
+
+def backfill_digest_fields_mongo(collection):
+    """Store key_crc and row_crc on the MongoDB rows written before they existed, reading only those rows."""
+    projection = {'_id': 1, 'student-ID': 1, 'course-id': 1, 'grade': 1}
+    rows = collection.find({'row_crc': {'$exists': False}}, projection).batch_size(MERGE_BATCH_SIZE)
+    backfilled = 0
+    for batch in batched(rows, MERGE_BATCH_SIZE):
+        collection.bulk_write([UpdateOne({'_id': doc['_id']},
+                                         {'$set': mongo_digest_fields(doc['student-ID'], doc['course-id'], doc.get('grade'))})
+                               for doc in batch], ordered=False)
+        backfilled += len(batch)
+    if backfilled:
+        print(f"Debug: Stored digest fields on {backfilled} MongoDB rows")
+
+def digest_nodes_mongo(depth, parents=None):
+    """Return {node: (row_count, crc_sum)} for the MongoDB digest tree nodes at depth (0 for the leaf buckets),
+    only under the given parent nodes unless parents is None, aggregated server-side over the stored key_crc and row_crc."""
+    client = MongoClient('mongodb://localhost:27017/')
+    try:
+        db = client['university_db']
+        collection = db['student_course_grades']
+        if parents is None:
+            backfill_digest_fields_mongo(collection)
+        
+        def node_of(level):
+            return {'$floor': {'$divide': [{'$mod': ['$key_crc', DIGEST_BUCKETS]}, DIGEST_FANOUT ** level]}}
+        
+        pipeline = [{'$group': {'_id': node_of(depth), 'count': {'$sum': 1}, 'crc_sum': {'$sum': '$row_crc'}}}]
+        if parents is not None:
+            pipeline.insert(0, {'$match': {'$expr': {'$in': [node_of(depth + 1), sorted(parents)]}}})
+        return {int(doc['_id']): (int(doc['count']), int(doc['crc_sum'])) for doc in collection.aggregate(pipeline)}
     finally:
-        if cursor:
-            cursor.close()
-        if conn and conn.is_connected():
-            conn.close()
+        client.close()
 
-def get_hive(student_id, course_id):
-    """Retrieve a row from Hive based on student_id and course_id."""
+def digest_nodes_mysql(depth, parents=None):
+    """Return {node: (row_count, crc_sum)} for the MySQL digest tree nodes at depth, only under the given parent
+    nodes unless parents is None, aggregated server-side."""
+    conn = mysql.connector.connect(
+        host='localhost',
+        user='root',
+        password='admin',
+        database='university_db'
+    )
+    cursor = None
     try:
-        conn = hive.connect(host='localhost', port=10000, database='default')
         cursor = conn.cursor()
         
+        bucket = "(CRC32(CONCAT_WS('|', student_id, course_id)) %% %d)" % DIGEST_BUCKETS
+        where = ''
+        if parents is not None:
+            where = "WHERE %s DIV %d IN (%s)" % (bucket, DIGEST_FANOUT ** (depth + 1), ', '.join(str(node) for node in parents))
         query = """
-        SELECT student_id, course_id, roll_no, email_id, grade
+        SELECT %s DIV %d AS node,
+               COUNT(*), SUM(CRC32(CONCAT_WS('|', student_id, course_id, grade)))
         FROM student_course_grades
-        WHERE student_id = '%s' AND course_id = '%s'
-        """
-        cursor.execute(query % (student_id, course_id))
-        result = cursor.fetchone()
-        
-        if result:
-            # Convert tuple to dict for consistent output
-            result_dict = {
-                'student_id': result[0],
-                'course_id': result[1],
-                'roll_no': result[2],
-                'email_id': result[3],
-                'grade': result[4]
-            }
-            print("Hive Result:", result_dict)
-        else:
-            print(f"No record found in Hive for student_id: {student_id}, course_id: {course_id}")
-        
-        log_operation(HIVE_LOG, 'GET', student_id, course_id)
-        return result_dict
-    
-    except Exception as e:
-        print(f"Hive Error: {e}")
-        return None
+        %s
+        GROUP BY node
+        """ % (bucket, DIGEST_FANOUT ** depth, where)
+        cursor.execute(query)
+        return {int(node): (int(count), int(crc_sum)) for node, count, crc_sum in cursor.fetchall()}
     finally:
         if cursor:
             cursor.close()
-        if conn:
+        if conn.is_connected():
             conn.close()
 
-def set_hive(student_id, course_id, new_grade):
-    """Update the grade in Hive for the given student_id and course_id."""
+def digest_nodes_hive(depth, parents=None):
+    """Return {node: (row_count, crc_sum)} for the Hive digest tree nodes at depth, only under the given parent
+    nodes unless parents is None, aggregated server-side."""
+    flush_hive_writes()
+    conn = hive.connect(host='localhost', port=10000, database='default')
+    cursor = None
     try:
-        conn = hive.connect(host='localhost', port=10000, database='default')
         cursor = conn.cursor()
         
+        bucket = "(crc32(concat_ws('|', student_id, course_id)) %% %d)" % DIGEST_BUCKETS
+        where = ''
+        if parents is not None:
+            where = "WHERE %s DIV %d IN (%s)" % (bucket, DIGEST_FANOUT ** (depth + 1), ', '.join(str(node) for node in parents))
         query = """
-        INSERT OVERWRITE TABLE student_course_grades
-        SELECT student_id, course_id, roll_no, email_id, 
-               CASE WHEN student_id = '%s' AND course_id = '%s' THEN '%s' ELSE grade END
+        SELECT %s DIV %d,
+               COUNT(*), SUM(crc32(concat_ws('|', student_id, course_id, grade)))
         FROM student_course_grades
-        """
-        cursor.execute(query % (student_id, course_id, new_grade))
-        conn.commit()
-        
-        # Verify update
-        cursor.execute("""
-        SELECT COUNT(*) 
-        FROM student_course_grades 
-        WHERE student_id = '%s' AND course_id = '%s' AND grade = '%s'
-        """ % (student_id, course_id, new_grade))
-        updated = cursor.fetchone()[0]
+        %s
+        GROUP BY %s DIV %d
+        """ % (bucket, DIGEST_FANOUT ** depth, where, bucket, DIGEST_FANOUT ** depth)
+        cursor.execute(query)
+        return {int(node): (int(count), int(crc_sum)) for node, count, crc_sum in cursor.fetchall()}
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+# Functions that compute digest tree nodes for each database system
+DIGEST_NODE_FUNCTIONS = {
+    'MongoDB': digest_nodes_mongo,
+    'MySQL': digest_nodes_mysql,
+    'Hive': digest_nodes_hive
+}
+
+def digest_tree_depth():
+    """Return the depth of the digest tree root: the level with a single node above all DIGEST_BUCKETS leaves."""
+    depth = 0
+    while DIGEST_FANOUT ** depth < DIGEST_BUCKETS:
+        depth += 1
+    return depth
+
+def diff_digest_trees(system_a, system_b):
+    """Walk the digest trees of two systems from the root and return (divergent leaf buckets, digest bytes pulled).
+
+    Each level is aggregated server-side and only the children of divergent nodes are pulled, so matching
+    subtrees cost one node digest each.
+    """
+    pulled_bytes = 0
+    parents = None
+    for depth in range(digest_tree_depth(), -1, -1):
+        nodes_a = DIGEST_NODE_FUNCTIONS[system_a](depth, parents)
+        nodes_b = DIGEST_NODE_FUNCTIONS[system_b](depth, parents)
+        pulled_bytes += DIGEST_NODE_BYTES * (len(nodes_a) + len(nodes_b))
+        # A node with no rows on one side is missing from its result
+        parents = sorted(node for node in nodes_a.keys() | nodes_b.keys()
+                         if nodes_a.get(node, (0, 0)) != nodes_b.get(node, (0, 0)))
+        if not parents:
+            return [], pulled_bytes
+    return parents, pulled_bytes
+
+def fetch_bucket_rows_mongo(buckets):
+    """Return {(student_id, course_id): (grade, version)} for the MongoDB rows in the given digest buckets."""
+    client = MongoClient('mongodb://localhost:27017/')
+    try:
+        db = client['university_db']
+        collection = db['student_course_grades']
         
-        if updated > 0:
-            print(f"Grade updated to {new_grade} in Hive for student_id: {student_id}, course_id: {course_id}")
-        else:
-            print(f"No record found in Hive for student_id: {student_id}, course_id: {course_id}")
+        # The bucket filter runs server-side, so only the rows in the given buckets are returned
+        backfill_digest_fields_mongo(collection)
+        query = {'$expr': {'$in': [{'$mod': ['$key_crc', DIGEST_BUCKETS]}, sorted(buckets)]}}
+        projection = {'_id': 0, 'student-ID': 1, 'course-id': 1, 'grade': 1, 'version': 1}
+        return {(doc['student-ID'], doc['course-id']): (doc.get('grade'), doc.get('version') or 0)
+                for doc in collection.find(query, projection).batch_size(MERGE_BATCH_SIZE)}
+    finally:
+        client.close()
+
+def fetch_bucket_rows_mysql(buckets):
+    """Return {(student_id, course_id): (grade, version)} for the MySQL rows in the given digest buckets."""
+    conn = mysql.connector.connect(
+        host='localhost',
+        user='root',
+        password='admin',
+        database='university_db'
+    )
+    cursor = None
+    try:
+        cursor = conn.cursor()
         
-        log_operation(HIVE_LOG, 'SET', student_id, course_id, new_grade)
-        return updated > 0
-    
-    except Exception as e:
-        print(f"Hive Error: {e}")
-        return False
+        query = """
+        SELECT student_id, course_id, grade, version
+        FROM student_course_grades
+        WHERE CRC32(CONCAT_WS('|', student_id, course_id)) %% %d IN (%s)
+        """ % (DIGEST_BUCKETS, ', '.join(str(bucket) for bucket in buckets))
+        cursor.execute(query)
+        return {(student_id, course_id): (grade, version or 0) for student_id, course_id, grade, version in cursor.fetchall()}
     finally:
         if cursor:
             cursor.close()
-        if conn:
+        if conn.is_connected():
             conn.close()
 
-def merge_hive(database_system):
-    """Merge Hive with the state of another system based on operation logs."""
-    conn = None
+def fetch_bucket_rows_hive(buckets):
+    """Return {(student_id, course_id): (grade, version)} for the Hive rows in the given digest buckets."""
+    flush_hive_writes()
+    conn = hive.connect(host='localhost', port=10000, database='default')
     cursor = None
     try:
-        # Map database system to log file
-        log_map = {
-            'MongoDB': MONGO_LOG,
-            'MySQL': MYSQL_LOG,
-            'Hive': HIVE_LOG
-        }
-        
-        if database_system not in log_map:
-            print(f"Invalid database system: {database_system}. Choose MongoDB, MySQL, or Hive.")
-            return False
-        
-        if database_system == 'Hive':
-            print("Cannot merge Hive with itself.")
-            return False
-        
-        local_log = HIVE_LOG
-        remote_log = log_map[database_system]
-        
-        # Get merged updates and total log lines
-        updates, total_local_lines, total_remote_lines = merge_logs(local_log, remote_log, 'Hive', database_system)
+        cursor = conn.cursor()
         
-        if not updates:
-            print("No updates to merge.")
-            log_merge_operation('Hive', database_system, total_local_lines, total_remote_lines)
-            return False
+        query = """
+        SELECT student_id, course_id, grade, COALESCE(version, 0)
+        FROM student_course_grades
+        WHERE crc32(concat_ws('|', student_id, course_id)) %% %d IN (%s)
+        """ % (DIGEST_BUCKETS, ', '.join(str(bucket) for bucket in buckets))
+        cursor.execute(query)
+        return {(student_id, course_id): (grade, version) for student_id, course_id, grade, version in cursor.fetchall()}
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+# Functions that read the rows of some digest buckets from each database system
+FETCH_BUCKET_ROWS = {
+    'MongoDB': fetch_bucket_rows_mongo,
+    'MySQL': fetch_bucket_rows_mysql,
+    'Hive': fetch_bucket_rows_hive
+}
+
+def verify_backends(system_a, system_b, repair=False):
+    """Compare two systems by Merkle digest and return the repair batch {system: updates} for the divergent keys.
+
+    Only the node digests along divergent paths are pulled, level by level, then only the rows in divergent buckets are read.
+    The side with the newer version wins each key. With repair=True the batch is applied right away.
+    """
+    try:
+        if system_a not in LOG_MAP or system_b not in LOG_MAP or system_a == system_b:
+            print(f"Invalid systems to verify: {system_a}, {system_b}. Choose two of MongoDB, MySQL, or Hive.")
+            return None
         
-        # Connect to Hive
-        conn = hive.connect(host='localhost', port=10000, database='default')
-        cursor = conn.cursor()
+        buckets, pulled_bytes = diff_digest_trees(system_a, system_b)
+        print(f"Debug: Pulled {pulled_bytes} digest bytes, {len(buckets)} of {DIGEST_BUCKETS} buckets differ")
         
-        # Apply updates
-        updated_count = 0
-        for (student_id, course_id), (grade, timestamp) in updates.items():
-            query = """
-            INSERT OVERWRITE TABLE student_course_grades
-            SELECT student_id, course_id, roll_no, email_id, 
-                   CASE WHEN student_id = '%s' AND course_id = '%s' THEN '%s' ELSE grade END
-            FROM student_course_grades
-            """
-            cursor.execute(query % (student_id, course_id, grade))
-            conn.commit()
-            
-            # Verify update
-            cursor.execute("""
-            SELECT COUNT(*) 
-            FROM student_course_grades 
-            WHERE student_id = '%s' AND course_id = '%s' AND grade = '%s'
-            """ % (student_id, course_id, grade))
-            if cursor.fetchone()[0] > 0:
-                updated_count += 1
-                complete_log_operation(HIVE_LOG, 'SET', student_id, course_id, timestamp, grade)
+        repairs = {system_a: {}, system_b: {}}
+        if buckets:
+            rows_a = FETCH_BUCKET_ROWS[system_a](set(buckets))
+            rows_b = FETCH_BUCKET_ROWS[system_b](set(buckets))
+            for key in rows_a.keys() | rows_b.keys():
+                if key not in rows_a or key not in rows_b:
+                    print(f"Key {key} exists only in {system_a if key in rows_a else system_b}")
+                    continue
+                (grade_a, version_a), (grade_b, version_b) = rows_a[key], rows_b[key]
+                if grade_a == grade_b:
+                    continue
+                # The newer version wins; on equal versions the row is left for a manual check
+                if version_a > version_b:
+                    repairs[system_b][key] = (grade_a, version_timestamp(version_a), (version_origin(version_a), version_a))
+                elif version_b > version_a:
+                    repairs[system_a][key] = (grade_b, version_timestamp(version_b), (version_origin(version_b), version_b))
+                else:
+                    print(f"Key {key} differs at equal version {version_a}: {system_a}={grade_a}, {system_b}={grade_b}")
         
-        # Log the merge operation
-        log_merge_operation('Hive', database_system, total_local_lines, total_remote_lines)
+        print(f"{system_a} and {system_b}: {len(repairs[system_a])} keys to repair in {system_a}, "
+              f"{len(repairs[system_b])} keys to repair in {system_b}.")
         
-        print(f"Merged {updated_count} records into Hive from {database_system}.")
-        return updated_count > 0
+        if repair:
+            for system, updates in repairs.items():
+                if updates:
+                    applied_count, skipped_count, missing_count = APPLY_UPDATES[system](updates.items())
+                    print(f"Repaired {applied_count} records in {system}.")
+        return repairs
     
     except Exception as e:
-        print(f"Hive Merge Error: {e}")
-        return False
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+        print(f"Verify Error: {e}")
+        return None
 
 def main():
     """Main function to handle user input and call the appropriate get, set, or merge function."""
@@ -581,15 +3214,18 @@ def main():
             print("1. MongoDB")
             print("2. MySQL")
             print("3. Hive")
-            merge_choice = input("Enter choice (1-3): ").strip()
+            merge_choices = [c.strip() for c in input("Enter choice (1-3, comma-separated for several): ").split(',')]
             
-            if merge_choice not in ['1', '2', '3']:
+            if any(c not in ['1', '2', '3'] for c in merge_choices):
                 print("Invalid merge choice. Please select 1, 2, or 3.")
                 continue
             
             # Map choice to database system
             db_map = {'1': 'MongoDB', '2': 'MySQL', '3': 'Hive'}
-            merge_system = db_map[merge_choice]
+            if len(merge_choices) > 1:
+                merge_multi(db_map[choice], [db_map[c] for c in merge_choices])
+                continue
+            merge_system = db_map[merge_choices[0]]
             
             if choice == '1':  # MongoDB
                 merge_mongo(merge_system)
@@ -616,128 +3252,273 @@ def main():
                     set_hive(student_id, course_id, new_grade)
 
 
-# def run_test_case(filename):
-#     """
-#     Run a test case from a file with commands in the format:
-#     SYSTEM . OPERATION ( parameters )
-#     Where:
-#     - SYSTEM is one of: MONGO, SQL, HIVE
-#     - OPERATION is one of: GET, SET, MERGE
-#     - parameters depend on the operation
-#     """
-#     try:
-#         with open(filename, 'r') as f:
-#             commands = f.readlines()
-        
-#         for i, line in enumerate(commands, 1):
-#             try:
-#                 # Skip empty lines
-#                 if not line.strip():
-#                     continue
-                
-#                 # Remove any leading numbers and commas (e.g. "1, " or "2, ")
-#                 clean_line = re.sub(r'^\d+\s*,\s*', '', line.strip())
-                
-#                 # Extract system, operation, and parameters
-#                 match = re.match(r'(\w+)\s*\.\s*(\w+)\s*\((.+)\)', clean_line)
-#                 if not match:
-#                     print(f"Line {i}: Invalid format - {clean_line}")
-#                     continue
-                
-#                 system, operation, params = match.groups()
-#                 system = system.strip().upper()
-#                 operation = operation.strip().upper()
-#                 params = params.strip()
-                
-#                 # Map system names
-#                 system_map = {
-#                     'MONGO': 'MongoDB',
-#                     'SQL': 'MySQL',
-#                     'HIVE': 'Hive'
-#                 }
-                
-#                 if system not in system_map:
-#                     print(f"Line {i}: Invalid system - {system}")
-#                     continue
-                
-#                 db_system = system_map[system]
-                
-#                 print(f"\n--- Processing command: {db_system}.{operation}({params}) ---")
-                
-#                 # Process operations
-#                 if operation == 'GET':
-#                     # Parse parameters: student_id, course_id
-#                     match = re.match(r'\s*([^,]+)\s*,\s*([^)]+)\s*', params)
-#                     if not match:
-#                         print(f"Line {i}: Invalid GET parameters - {params}")
-#                         continue
-                    
-#                     student_id, course_id = match.groups()
-#                     student_id = student_id.strip()
-#                     course_id = course_id.strip()
-                    
-#                     # Call appropriate get function
-#                     if db_system == 'MongoDB':
-#                         get_mongo(student_id, course_id)
-#                     elif db_system == 'MySQL':
-#                         get_mysql(student_id, course_id)
-#                     elif db_system == 'Hive':
-#                         get_hive(student_id, course_id)
-                
-#                 elif operation == 'SET':
-#                     # Parse parameters: ((student_id, course_id), grade)
-#                     match = re.match(r'\(\(\s*([^,]+)\s*,\s*([^)]+)\s*\)\s*,\s*([^)]+)\s*', params)
-#                     if not match:
-#                         print(f"Line {i}: Invalid SET parameters - {params}")
-#                         continue
-                    
-#                     student_id, course_id, grade = match.groups()
-#                     student_id = student_id.strip()
-#                     course_id = course_id.strip()
-#                     grade = grade.strip()
-                    
-#                     # Call appropriate set function
-#                     if db_system == 'MongoDB':
-#                         set_mongo(student_id, course_id, grade)
-#                     elif db_system == 'MySQL':
-#                         set_mysql(student_id, course_id, grade)
-#                     elif db_system == 'Hive':
-#                         set_hive(student_id, course_id, grade)
-                
-#                 elif operation == 'MERGE':
-#                     # Parse parameters: (target_system)
-#                     target_system = params.strip()
-                    
-#                     # Map to system name
-#                     target_map = {
-#                         'MONGO': 'MongoDB',
-#                         'SQL': 'MySQL',
-#                         'HIVE': 'Hive'
-#                     }
-                    
-#                     if target_system not in target_map:
-#                         print(f"Line {i}: Invalid target system - {target_system}")
-#                         continue
-                    
-#                     target_db = target_map[target_system]
-                    
-#                     # Call appropriate merge function
-#                     if db_system == 'MongoDB':
-#                         merge_mongo(target_db)
-#                     elif db_system == 'MySQL':
-#                         merge_mysql(target_db)
-#                     elif db_system == 'Hive':
-#                         merge_hive(target_db)
-                
-#                 else:
-#                     print(f"Line {i}: Invalid operation - {operation}")
-            
-#             except Exception as e:
-#                 print(f"Error processing line {i}: {str(e)}")
-        
-#     except Exception as e:
-#         print(f"Error running test case: {str(e)}")
+# Map test case system names to database systems
+TEST_CASE_SYSTEMS = {
+    'MONGO': 'MongoDB',
+    'SQL': 'MySQL',
+    'HIVE': 'Hive'
+}
+
+# Test case lines: SYSTEM . OPERATION ( arguments ), the parentheses optional for FLUSH and SNAPSHOT
+TEST_LINE_PATTERN = r'(\w+)\s*\.\s*(\w+)\s*(?:\((.*)\))?'
+
+def parse_set_params(line):
+    """Parse SYSTEM . SET (( student_id , course_id ) , grade ) into (student_id, course_id, grade), or return an error message."""
+    # Extract everything inside the outermost parentheses
+    open_paren_idx = line.find('(')
+    close_paren_idx = line.rfind(')')
+    if open_paren_idx == -1 or close_paren_idx == -1:
+        return f"Missing parentheses in SET - {line}"
+    set_params = line[open_paren_idx+1:close_paren_idx].strip()
+    
+    # Split the parameters at the first comma AFTER the inner closing parenthesis
+    inner_close_paren_idx = set_params.find(')')
+    if inner_close_paren_idx == -1:
+        return f"Missing inner closing parenthesis - {set_params}"
+    comma_after_paren_idx = set_params.find(',', inner_close_paren_idx)
+    if comma_after_paren_idx == -1:
+        return f"Missing comma after inner parentheses - {set_params}"
+    
+    inner_part = set_params[:comma_after_paren_idx].strip()
+    grade = set_params[comma_after_paren_idx+1:].strip()
+    if not inner_part.startswith('('):
+        return f"Inner part must start with '(' - {inner_part}"
+    
+    # Remove the outer parentheses from inner_part and split it into student_id and course_id
+    inner_content = inner_part[1:-1].strip() if inner_part.endswith(')') else inner_part[1:].strip()
+    inner_parts = inner_content.split(',')
+    if len(inner_parts) != 2:
+        return f"Invalid student/course format - {inner_content}"
+    return inner_parts[0].strip(), inner_parts[1].strip(), grade
+
+def compile_systems(system, targets):
+    """Map a test case system and comma-separated target systems to database systems, or return an error message."""
+    target_systems = [target.strip().upper() for target in targets.split(',')]
+    if system not in TEST_CASE_SYSTEMS or any(target not in TEST_CASE_SYSTEMS for target in target_systems):
+        return f"Invalid system - {system} or {', '.join(target_systems)}"
+    return [TEST_CASE_SYSTEMS[target] for target in target_systems]
+
+def compile_test_line(line):
+    """Compile one test case line into an (operation, system, args) tuple; invalid lines become ('ERROR', None, (message,)).
+
+    Apart from the standalone commands, a line is parsed as SYSTEM . OPERATION ( arguments ) and dispatched on the
+    OPERATION token, so arguments that contain operation names (e.g. a student ID such as SIDSYNC1) are never mistaken for one.
+    """
+    upper = line.upper()
+    if upper == 'CACHE STATS':
+        return 'CACHE_STATS', None, ()
+    if upper == 'HEDGE STATS':
+        return 'HEDGE_STATS', None, ()
+    # COMPARE HISTOGRAMS [( course_id )] checks that the three systems agree on the grade distributions
+    if upper.startswith('COMPARE HISTOGRAMS'):
+        return 'COMPARE_HISTOGRAMS', None, (line[len('COMPARE HISTOGRAMS'):].strip('() ') or None,)
+    if re.fullmatch(r'MERGE\s*(ALL|\(\s*ALL\s*\))', upper):
+        return 'MERGE_ALL', None, ()
+    
+    match = re.fullmatch(TEST_LINE_PATTERN, line)
+    if not match:
+        return 'ERROR', None, (f"Invalid format - {line}",)
+    system, operation, params = match.group(1).upper(), match.group(2).upper(), match.group(3)
+    if params is None and operation not in ('FLUSH', 'SNAPSHOT'):
+        return 'ERROR', None, (f"Missing parentheses in {operation} - {line}",)
+    
+    if operation == 'GET':
+        param_parts = params.split(',')
+        if len(param_parts) != 2:
+            return 'ERROR', None, (f"Invalid GET parameters - {params.strip()}",)
+        # ANY . GET reads from the fastest up-to-date system, HEDGE . GET adds a backup read if the first is slow
+        if system in ('ANY', 'HEDGE'):
+            return system + '_GET', None, (param_parts[0].strip(), param_parts[1].strip())
+        if system not in TEST_CASE_SYSTEMS:
+            return 'ERROR', None, (f"Invalid system - {system}",)
+        return 'GET', TEST_CASE_SYSTEMS[system], (param_parts[0].strip(), param_parts[1].strip())
+    
+    if operation == 'SET':
+        if system not in TEST_CASE_SYSTEMS:
+            return 'ERROR', None, (f"Invalid system - {system}",)
+        params = parse_set_params(line)
+        if isinstance(params, str):
+            return 'ERROR', None, (params,)
+        return 'SET', TEST_CASE_SYSTEMS[system], params
+    
+    # SYSTEM . MERGE ( OTHER , ... ) merges one or more systems into SYSTEM,
+    # SYSTEM . FANOUT ( TARGET , ... ) merges SYSTEM into every target concurrently
+    if operation in ('MERGE', 'FANOUT'):
+        target_systems = compile_systems(system, params)
+        if isinstance(target_systems, str):
+            return 'ERROR', None, (target_systems,)
+        return operation, TEST_CASE_SYSTEMS[system], (target_systems,)
+    
+    # SYSTEM . SYNC ( OTHER ) pulls changed rows by version, SYSTEM . VERIFY ( OTHER ) compares digests and repairs
+    if operation in ('SYNC', 'VERIFY'):
+        target_systems = compile_systems(system, params)
+        if isinstance(target_systems, str):
+            return 'ERROR', None, (target_systems,)
+        if len(target_systems) != 1:
+            return 'ERROR', None, (f"Invalid {operation} format - {line}",)
+        return operation, TEST_CASE_SYSTEMS[system], (target_systems[0],)
+    
+    # SYSTEM . HISTOGRAM ( [course_id] ), SYSTEM . COURSE_COUNT ( [student_id] ),
+    # SYSTEM . SCAN_STUDENT ( student_id ) and SYSTEM . SCAN_COURSE ( course_id )
+    if operation in ('HISTOGRAM', 'COURSE_COUNT', 'SCAN_STUDENT', 'SCAN_COURSE'):
+        value = params.strip() or None
+        if system not in TEST_CASE_SYSTEMS or (operation.startswith('SCAN') and not value):
+            return 'ERROR', None, (f"Invalid {operation.lower()} - {line}",)
+        return operation, TEST_CASE_SYSTEMS[system], (value,)
+    
+    # HIVE . FLUSH writes the pending write-behind SETs; HIVE . SNAPSHOT rebuilds the local Hive snapshot
+    if operation in ('FLUSH', 'SNAPSHOT'):
+        if system != 'HIVE':
+            return 'ERROR', None, (f"Only Hive supports {operation} - {line}",)
+        return operation, 'Hive', ()
+    
+    return 'ERROR', None, (f"Invalid operation - {line}",)
+
+def compile_test_case(filename):
+    """Compile a test case file into a list of (line_no, operation, system, args) tuples, skipping empty lines."""
+    with open(filename, 'r') as f:
+        commands = f.readlines()
+    
+    operations = []
+    for i, line in enumerate(commands, 1):
+        line = line.strip()
+        if line:
+            operations.append((i,) + compile_test_line(line))
+    return operations
+
+def not_found_message(system, student_id, course_id):
+    """Return the 'No record found' message a single GET or SET on the system prints."""
+    student_column, course_column = KEY_COLUMNS[system]
+    return f"No record found in {system} for {student_column}: {student_id}, {course_column}: {course_id}"
+
+def run_operation(operation, system, args):
+    """Execute one compiled test case operation."""
+    if operation == 'CACHE_STATS':
+        print("\n--- Processing command: CACHE STATS ---")
+        for cache_system, stats in get_cache_stats().items():
+            print(f"{cache_system} GET cache: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} cached")
+    
+    elif operation == 'HEDGE_STATS':
+        print("\n--- Processing command: HEDGE STATS ---")
+        stats = get_hedge_stats()
+        print(f"Hedged GETs: {stats['gets']} reads, {stats['hedged']} hedged ({stats['hedge_rate']:.1%}), "
+              f"{stats['backup_wins']} won by the backup ({stats['backup_win_rate']:.1%})")
+    
+    elif operation == 'COMPARE_HISTOGRAMS':
+        print(f"\n--- Processing command: COMPARE HISTOGRAMS({args[0] or 'ALL'}) ---")
+        compare_histograms(course_id=args[0])
+    
+    elif operation == 'MERGE_ALL':
+        print("\n--- Processing command: MERGE ALL ---")
+        merge_all()
+    
+    elif operation == 'MERGE':
+        target_dbs = args[0]
+        print(f"\n--- Processing command: {system}.MERGE({', '.join(target_dbs)}) ---")
+        if len(target_dbs) > 1:
+            merge_multi(system, target_dbs)
+        elif system == 'MongoDB':
+            merge_mongo(target_dbs[0])
+        elif system == 'MySQL':
+            merge_mysql(target_dbs[0])
+        elif system == 'Hive':
+            merge_hive(target_dbs[0])
+    
+    elif operation == 'SYNC':
+        print(f"\n--- Processing command: {system}.SYNC({args[0]}) ---")
+        sync_versions(system, args[0])
+    
+    elif operation == 'FANOUT':
+        print(f"\n--- Processing command: {system}.FANOUT({', '.join(args[0])}) ---")
+        merge_fanout(system, args[0])
+    
+    elif operation in ('HISTOGRAM', 'COURSE_COUNT'):
+        print(f"\n--- Processing command: {system}.{operation}({args[0] or 'ALL'}) ---")
+        if operation == 'HISTOGRAM':
+            for course, grades in sorted(GRADE_HISTOGRAM[system](args[0]).items()):
+                print(f"{system} Histogram {course}:", dict(sorted(grades.items(), key=lambda item: str(item[0]))))
+        else:
+            for student, count in sorted(COURSE_COUNTS[system](args[0]).items()):
+                print(f"{system} Courses {student}: {count}")
+    
+    elif operation in ('SCAN_STUDENT', 'SCAN_COURSE'):
+        by_student = operation == 'SCAN_STUDENT'
+        print(f"\n--- Processing command: {system}.{operation}({args[0]}) ---")
+        rows = scan_by_student(system, args[0]) if by_student else scan_by_course(system, args[0])
+        count = 0
+        for row in rows:
+            print(f"{system} Row:", row)
+            count += 1
+        print(f"{system} Scan: {count} records for {'student' if by_student else 'course'} {args[0]}")
+    
+    elif operation == 'FLUSH':
+        print("\n--- Processing command: Hive.FLUSH ---")
+        flush_hive_writes()
+    
+    elif operation == 'SNAPSHOT':
+        print("\n--- Processing command: Hive.SNAPSHOT ---")
+        build_hive_snapshot()
+    
+    elif operation == 'VERIFY':
+        print(f"\n--- Processing command: {system}.VERIFY({args[0]}) ---")
+        verify_backends(system, args[0], repair=True)
+    
+    elif operation == 'ANY_GET':
+        print(f"\n--- Processing command: ANY.GET({args[0]}, {args[1]}) ---")
+        routed_get(*args)
+    
+    elif operation == 'HEDGE_GET':
+        print(f"\n--- Processing command: HEDGE.GET({args[0]}, {args[1]}) ---")
+        hedged_get(*args)
+    
+    elif operation == 'GET':
+        print(f"\n--- Processing command: {system}.GET({args[0]}, {args[1]}) ---")
+        GET_FUNCTIONS[system](*args)
+    
+    elif operation == 'SET':
+        student_id, course_id, grade = args
+        print(f"\n--- Processing command: {system}.SET(({student_id}, {course_id}), {grade}) ---")
+        if system == 'MongoDB':
+            set_mongo(student_id, course_id, grade)
+        elif system == 'MySQL':
+            set_mysql(student_id, course_id, grade)
+        elif system == 'Hive':
+            set_hive(student_id, course_id, grade)
+
+def run_batch(operation, system, batch):
+    """Execute a run of compiled GETs or SETs on one system with one get_many or set_many call, printing per line as run_operation would.
 
+    If the batched call fails, the lines are run one at a time instead, so each reports its own result or error.
+    """
+    if operation == 'GET':
+        rows = get_many(system, [args for line_no, args in batch], quiet=True)
+        if rows is None:
+            for line_no, args in batch:
+                run_operation(operation, system, args)
+            return
+        for line_no, (student_id, course_id) in batch:
+            print(f"\n--- Processing command: {system}.GET({student_id}, {course_id}) ---")
+            row = rows.get((student_id, course_id))
+            if row:
+                print(f"{system} Result:", row)
+            else:
+                print(not_found_message(system, student_id, course_id))
+        return
+    
+    flags = set_many(system, [((student_id, course_id), grade) for line_no, (student_id, course_id, grade) in batch], quiet=True)
+    if flags is None:
+        for line_no, args in batch:
+            run_operation(operation, system, args)
+        return
+    for line_no, (student_id, course_id, grade) in batch:
+        print(f"\n--- Processing command: {system}.SET(({student_id}, {course_id}), {grade}) ---")
+        if system == 'Hive' and HIVE_WRITE_BEHIND and flags.get((student_id, course_id)):
+            print(f"Grade update to {grade} queued for Hive for student_id: {student_id}, course_id: {course_id}")
+        elif flags.get((student_id, course_id)):
+            student_column, course_column = KEY_COLUMNS[system]
+            print(f"Grade updated to {grade} in {system} for {student_column}: {student_id}, {course_column}: {course_id}")
+        else:
+            print(not_found_message(system, student_id, course_id))
 
 def run_test_case(filename):
     """
@@ -747,181 +3528,39 @@ def run_test_case(filename):
     - SYSTEM is one of: MONGO, SQL, HIVE
     - OPERATION is one of: GET, SET, MERGE
     - parameters depend on the operation
+
+    The file is first compiled into a list of operations. Runs of consecutive GETs or SETs on the same system are
+    then executed with one get_many or set_many call each, with the same output, in the same order, as line by line.
+    A SET run ends before a key it already holds, so every SET line keeps its own log record, as line by line.
     """
     try:
-        with open(filename, 'r') as f:
-            commands = f.readlines()
-        
-        for i, line in enumerate(commands, 1):
-            try:
-                # Skip empty lines
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Map system names
-                system_map = {
-                    'MONGO': 'MongoDB',
-                    'SQL': 'MySQL',
-                    'HIVE': 'Hive'
-                }
-                
-                time.sleep(1)
-                # Process MERGE operations (simpler format)
-                if 'MERGE' in line:
-                    parts = line.split('.')
-                    if len(parts) != 2:
-                        print(f"Line {i}: Invalid format - {line}")
-                        continue
-                    
-                    system = parts[0].strip().upper()
-                    merge_parts = parts[1].strip().split('(')
-                    if len(merge_parts) != 2 or not merge_parts[1].endswith(')'):
-                        print(f"Line {i}: Invalid MERGE format - {line}")
-                        continue
-                    
-                    target_system = merge_parts[1].strip('() ').upper()
-                    
-                    if system not in system_map or target_system not in system_map:
-                        print(f"Line {i}: Invalid system - {system} or {target_system}")
-                        continue
-                    
-                    db_system = system_map[system]
-                    target_db = system_map[target_system]
-                    
-                    print(f"\n--- Processing command: {db_system}.MERGE({target_db}) ---")
-                    
-                    # Call appropriate merge function
-                    if db_system == 'MongoDB':
-                        merge_mongo(target_db)
-                    elif db_system == 'MySQL':
-                        merge_mysql(target_db)
-                    elif db_system == 'Hive':
-                        merge_hive(target_db)
-                
-                # Process GET operations
-                elif 'GET' in line:
-                    parts = line.split('.')
-                    if len(parts) != 2:
-                        print(f"Line {i}: Invalid format - {line}")
-                        continue
-                    
-                    system = parts[0].strip().upper()
-                    get_parts = parts[1].strip()
-                    
-                    # Extract student_id and course_id
-                    start_idx = get_parts.find('(')
-                    end_idx = get_parts.rfind(')')
-                    if start_idx == -1 or end_idx == -1:
-                        print(f"Line {i}: Invalid GET format - {line}")
-                        continue
-                    
-                    params = get_parts[start_idx+1:end_idx].strip()
-                    param_parts = params.split(',')
-                    if len(param_parts) != 2:
-                        print(f"Line {i}: Invalid GET parameters - {params}")
-                        continue
-                    
-                    student_id = param_parts[0].strip()
-                    course_id = param_parts[1].strip()
-                    
-                    if system not in system_map:
-                        print(f"Line {i}: Invalid system - {system}")
-                        continue
-                    
-                    db_system = system_map[system]
-                    
-                    print(f"\n--- Processing command: {db_system}.GET({student_id}, {course_id}) ---")
-                    
-                    # Call appropriate get function
-                    if db_system == 'MongoDB':
-                        get_mongo(student_id, course_id)
-                    elif db_system == 'MySQL':
-                        get_mysql(student_id, course_id)
-                    elif db_system == 'Hive':
-                        get_hive(student_id, course_id)
-                
-                # Process SET operations
-                elif 'SET' in line:
-                    # Extract system name (part before the dot)
-                    dot_idx = line.find('.')
-                    if dot_idx == -1:
-                        print(f"Line {i}: Missing dot separator - {line}")
-                        continue
-                    
-                    system = line[:dot_idx].strip().upper()
-                    if system not in system_map:
-                        print(f"Line {i}: Invalid system - {system}")
-                        continue
-                    
-                    db_system = system_map[system]
-                    
-                    # Parse the SET part with direct string handling
-                    # FORMAT: SYSTEM . SET (( student_id , course_id ) , grade )
-                    
-                    # Extract everything inside the outermost parentheses
-                    open_paren_idx = line.find('(')
-                    close_paren_idx = line.rfind(')')
-                    
-                    if open_paren_idx == -1 or close_paren_idx == -1:
-                        print(f"Line {i}: Missing parentheses in SET - {line}")
-                        continue
-                    
-                    set_params = line[open_paren_idx+1:close_paren_idx].strip()
-                    
-                    # Split the parameters at the first comma AFTER the inner closing parenthesis
-                    inner_close_paren_idx = set_params.find(')')
-                    if inner_close_paren_idx == -1:
-                        print(f"Line {i}: Missing inner closing parenthesis - {set_params}")
-                        continue
-                    
-                    # Find the comma after the inner closing parenthesis
-                    comma_after_paren_idx = set_params.find(',', inner_close_paren_idx)
-                    if comma_after_paren_idx == -1:
-                        print(f"Line {i}: Missing comma after inner parentheses - {set_params}")
-                        continue
-                    
-                    # Extract the inner parentheses part and the grade
-                    inner_part = set_params[:comma_after_paren_idx].strip()
-                    grade = set_params[comma_after_paren_idx+1:].strip()
-                    
-                    # Verify that inner_part starts with '(' and extract student_id and course_id
-                    if not inner_part.startswith('('):
-                        print(f"Line {i}: Inner part must start with '(' - {inner_part}")
-                        continue
-                    
-                    # Remove the outer parentheses from inner_part
-                    inner_content = inner_part[1:-1].strip() if inner_part.endswith(')') else inner_part[1:].strip()
-                    
-                    # Split inner_content by comma to get student_id and course_id
-                    inner_parts = inner_content.split(',')
-                    if len(inner_parts) != 2:
-                        print(f"Line {i}: Invalid student/course format - {inner_content}")
-                        continue
-                    
-                    student_id = inner_parts[0].strip()
-                    course_id = inner_parts[1].strip()
-                    
-                    print(f"\n--- Processing command: {db_system}.SET(({student_id}, {course_id}), {grade}) ---")
-                    
-                    # Call appropriate set function
-                    if db_system == 'MongoDB':
-                        set_mongo(student_id, course_id, grade)
-                    elif db_system == 'MySQL':
-                        set_mysql(student_id, course_id, grade)
-                    elif db_system == 'Hive':
-                        set_hive(student_id, course_id, grade)
-                
-                else:
-                    print(f"Line {i}: Invalid operation - {line}")
-
-                    
-            
-            except Exception as e:
-                print(f"Error processing line {i}: {str(e)}")
-        
+        operations = compile_test_case(filename)
     except Exception as e:
         print(f"Error running test case: {str(e)}")
+        return
+    
+    position = 0
+    while position < len(operations):
+        line_no, operation, system, args = operations[position]
+        end = position + 1
+        if operation in ('GET', 'SET'):
+            keys = {tuple(args[:2])}
+            while end < len(operations) and operations[end][1:3] == (operation, system):
+                # set_many keeps only the last SET of a repeated key, so the repeat starts the next run
+                if operation == 'SET' and tuple(operations[end][3][:2]) in keys:
+                    break
+                keys.add(tuple(operations[end][3][:2]))
+                end += 1
+        try:
+            if operation == 'ERROR':
+                print(f"Line {line_no}: {args[0]}")
+            elif end - position > 1:
+                run_batch(operation, system, [(line_no, args) for line_no, operation, system, args in operations[position:end]])
+            else:
+                run_operation(operation, system, args)
+        except Exception as e:
+            print(f"Error processing line {line_no}: {str(e)}")
+        position = end
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 import pandas as pd
 from pymongo import MongoClient
+from key_filter import BloomFilter, KEY_FILTER_FILES
 
 # Connect to MongoDB
 client = MongoClient('mongodb://localhost:27017/')
@@ -10,10 +11,21 @@ collection = db['student_course_grades']
 csv_file = 'student_course_grades.csv'
 data = pd.read_csv(csv_file)
 
+# Loaded rows start at version 0; every later SET or merge stamps its own version
+data['version'] = 0
+
 # Convert to list of dictionaries
 records = data.to_dict('records')
 
 # Insert into MongoDB
 collection.insert_many(records)
+collection.create_index('version')
+# Point lookups and student scans use the compound key, course scans the course index
+collection.create_index([('student-ID', 1), ('course-id', 1)])
+collection.create_index('course-id')
+
+# Record every key in the collection so lookups of keys that were never loaded can skip MongoDB
+keys = [(doc['student-ID'], doc['course-id']) for doc in collection.find({}, {'_id': 0, 'student-ID': 1, 'course-id': 1})]
+BloomFilter.for_keys(keys).save(KEY_FILTER_FILES['MongoDB'])
 
 print("Data inserted into MongoDB successfully!")
\ No newline at end of file
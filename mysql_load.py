@@ -1,5 +1,6 @@
 import pandas as pd
 import mysql.connector
+from key_filter import BloomFilter, KEY_FILTER_FILES
 
 # Connect to MySQL
 conn = mysql.connector.connect(
@@ -23,7 +24,10 @@ CREATE TABLE IF NOT EXISTS student_course_grades (
     roll_no VARCHAR(50),
     email_id VARCHAR(100),
     grade CHAR(2),
-    PRIMARY KEY (student_id, course_id)
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (student_id, course_id),
+    INDEX idx_version (version),
+    INDEX idx_course (course_id)
 )
 """
 cursor.execute(create_table_query)
@@ -48,6 +52,11 @@ for _, row in data.iterrows():
 
 # Commit and close
 conn.commit()
+
+# Record every key in the table so lookups of keys that were never loaded can skip MySQL
+cursor.execute("SELECT student_id, course_id FROM student_course_grades")
+BloomFilter.for_keys(cursor.fetchall()).save(KEY_FILTER_FILES['MySQL'])
+
 cursor.close()
 conn.close()
 
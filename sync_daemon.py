@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from datetime import datetime
+
+import main_v8
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+# (target, source) pairs kept in sync: every system merges from the other two
+SYNC_PAIRS = [(target, source) for target in main_v8.LOG_MAP for source in main_v8.LOG_MAP if target != source]
+# A micro-batch is merged once it holds this many SETs or its oldest SET is this old
+SYNC_BATCH_MAX_SETS = 500
+SYNC_BATCH_MAX_SECONDS = 2.0
+# How often the logs are checked when inotify is not available
+SYNC_POLL_INTERVAL = 0.5
+# Replication lag per pair, rewritten after every check
+SYNC_STATUS_FILE = 'replication_lag.json'
+
+class LogTail:
+    """Follow one operation log and hand out the SET records appended since the last read."""
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.offset = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+        self.partial_line = ''
+
+    def read_new_sets(self):
+        """Return the (timestamp, origin) of every complete SET line appended since the last call."""
+        if not os.path.exists(self.log_file):
+            return []
+        size = os.path.getsize(self.log_file)
+        if size < self.offset:
+            # The log was truncated or replaced: start over
+            self.offset = 0
+            self.partial_line = ''
+        if size == self.offset:
+            return []
+        with open(self.log_file, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset).decode()
+        self.offset = size
+        lines = (self.partial_line + data).split('\n')
+        # Keep an unterminated last line for the next read
+        self.partial_line = lines.pop()
+        sets = []
+        for line in lines:
+            record = main_v8.parse_set_line(line.strip())
+            if record:
+                timestamp, key, grade, origin = record
+                sets.append((timestamp, origin))
+        return sets
+
+class SyncDaemon:
+    """Tail the three op logs and merge new SETs into their targets in small batches."""
+
+    def __init__(self, pairs=None):
+        self.pairs = pairs if pairs is not None else SYNC_PAIRS
+        self.tails = {system: LogTail(log_file) for system, log_file in main_v8.LOG_MAP.items()}
+        self.log_names = {os.path.basename(log_file) for log_file in main_v8.LOG_MAP.values()}
+        # Per pair: number of pending SETs and the timestamp of the oldest one
+        self.pending = {pair: [0, None] for pair in self.pairs}
+        self.inotify = None
+        if INotify is not None:
+            self.inotify = INotify()
+            self.inotify.add_watch(os.path.dirname(os.path.abspath(main_v8.MONGO_LOG)), flags.MODIFY | flags.CREATE)
+
+    def catch_up(self):
+        """Merge everything written since the last checkpoints before following the logs."""
+        for target in {target for target, source in self.pairs}:
+            sources = [source for pair_target, source in self.pairs if pair_target == target]
+            self.merge(target, sources)
+
+    def merge(self, target, sources):
+        """Merge the sources into the target and return True once the merge and its checkpoints are written."""
+        try:
+            counts = main_v8.apply_merge(target, sources)
+        except Exception as e:
+            print(f"{target} Merge Error: {e}")
+            return False
+        if counts is not None:
+            print(f"Merged {counts[0]} records into {target} from {', '.join(sources)}.")
+        return True
+
+    def wait_for_changes(self):
+        """Block until an operation log changes (inotify) or the poll interval passes."""
+        if self.inotify is None:
+            time.sleep(SYNC_POLL_INTERVAL)
+            return
+        # Other files in the directory, such as SYNC_STATUS_FILE, change on every pass, so keep waiting for a log event
+        deadline = time.monotonic() + SYNC_POLL_INTERVAL
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = self.inotify.read(timeout=max(1, int(remaining * 1000)))
+            if any(event.name in self.log_names for event in events):
+                return
+
+    def collect(self):
+        """Add newly logged SETs to the pending batch of every pair they still have to reach."""
+        for source, tail in self.tails.items():
+            for timestamp, origin in tail.read_new_sets():
+                for target, pair_source in self.pairs:
+                    # A record that originated at the target is an echo the merge would skip anyway
+                    if pair_source != source or (origin is not None and origin[0] == target):
+                        continue
+                    batch = self.pending[(target, source)]
+                    batch[0] += 1
+                    if batch[1] is None or timestamp < batch[1]:
+                        batch[1] = timestamp
+
+    def due_pairs(self):
+        """Return the pairs whose pending batch is full or old enough to merge."""
+        now = datetime.now()
+        due = []
+        for pair, (count, oldest) in self.pending.items():
+            if count >= SYNC_BATCH_MAX_SETS or (oldest is not None and (now - oldest).total_seconds() >= SYNC_BATCH_MAX_SECONDS):
+                due.append(pair)
+        return due
+
+    def flush(self, due):
+        """Merge the due batches, one merge per target across all its due sources; a failed merge stays pending."""
+        for target in {target for target, source in due}:
+            sources = [source for pair_target, source in due if pair_target == target]
+            if not self.merge(target, sources):
+                continue
+            for source in sources:
+                self.pending[(target, source)] = [0, None]
+
+    def replication_lag(self):
+        """Return {'target<-source': seconds} since the oldest SET not yet merged for each pair."""
+        now = datetime.now()
+        return {f"{target}<-{source}": (now - oldest).total_seconds() if oldest is not None else 0.0
+                for (target, source), (count, oldest) in self.pending.items()}
+
+    def write_status(self):
+        """Write the current replication lag per pair to SYNC_STATUS_FILE."""
+        tmp_file = SYNC_STATUS_FILE + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump({'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'lag_seconds': self.replication_lag()}, f, indent=2)
+        os.replace(tmp_file, SYNC_STATUS_FILE)
+
+    def run(self):
+        """Follow the logs until interrupted."""
+        print(f"Sync daemon started ({'inotify' if self.inotify is not None else 'polling'}) for {len(self.pairs)} pairs.")
+        self.catch_up()
+        try:
+            while True:
+                self.wait_for_changes()
+                self.collect()
+                due = self.due_pairs()
+                if due:
+                    self.flush(due)
+                self.write_status()
+        except KeyboardInterrupt:
+            print("Sync daemon stopped.")
+
+if __name__ == "__main__":
+    SyncDaemon().run()
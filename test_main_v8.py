@@ -0,0 +1,318 @@
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+import main_v8
+
+
+def test_sharded_apply_raises_when_one_shard_fails(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_v8, 'MERGE_BATCH_SIZE', 2)
+    monkeypatch.setattr(main_v8, 'MERGE_PIPELINE_QUEUE_SIZE', 1)
+    updates = [((f"SID{i:05d}", "CSE001"), ('A', datetime(2025, 1, 1), None)) for i in range(200)]
+    # Shard 0 gets its sentinel first, so a failure there used to leave the other shards waiting
+    failing_shard = 0
+
+    def apply_updates(shard_updates):
+        applied_count = 0
+        for key, value in shard_updates:
+            if main_v8.key_shard(key, 4) == failing_shard:
+                raise RuntimeError('shard failed')
+            applied_count += 1
+        return applied_count, 0, 0
+
+    monkeypatch.setitem(main_v8.APPLY_UPDATES, 'MySQL', apply_updates)
+    outcome = {}
+
+    def run():
+        try:
+            main_v8.apply_updates_sharded('MySQL', iter(updates), shards=4)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive(), 'apply_updates_sharded hung after a shard failed'
+    assert isinstance(outcome.get('error'), RuntimeError)
+
+
+def test_merge_frontier_skips_no_record_logged_after_the_merge(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    first, second = main_v8.next_origin_seqs('MongoDB', 2)
+    # Only the first SET reached the log when the merge ran; the second was issued but not yet appended
+    main_v8.complete_log_operation(main_v8.MONGO_LOG, 'SET', 'SID00001', 'CSE001', datetime(2025, 1, 1), 'A', ('MongoDB', first))
+    updates, checkpoints = main_v8.load_merge_updates('MySQL', ['MongoDB'])
+    assert [key for key, value in updates] == [('SID00001', 'CSE001')]
+    assert checkpoints[0][4] == first
+    main_v8.log_merge_operations(checkpoints)
+
+    main_v8.complete_log_operation(main_v8.MONGO_LOG, 'SET', 'SID00002', 'CSE001', datetime(2025, 1, 1), 'B', ('MongoDB', second))
+    updates, checkpoints = main_v8.load_merge_updates('MySQL', ['MongoDB'])
+    assert [key for key, value in updates] == [('SID00002', 'CSE001')]
+    assert checkpoints[0][4] == second
+
+
+def test_merge_picks_the_newest_version_within_a_second(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    older, newer = main_v8.next_origin_seqs('MongoDB', 2)
+    timestamp = datetime(2025, 1, 1)
+    # The newer version is logged first, as a concurrent writer can do within the same second
+    main_v8.complete_log_operation(main_v8.MONGO_LOG, 'SET', 'SID00001', 'CSE001', timestamp, 'A', ('MongoDB', newer))
+    main_v8.complete_log_operation(main_v8.MONGO_LOG, 'SET', 'SID00001', 'CSE001', timestamp, 'B', ('MongoDB', older))
+    result, total_local_lines, remote_totals, remote_seqs = main_v8.merge_logs_multi(
+        main_v8.MYSQL_LOG, {'MongoDB': main_v8.MONGO_LOG}, 'MySQL')
+    assert result[('SID00001', 'CSE001')][0] == 'A'
+    assert remote_seqs == {'MongoDB': newer}
+
+
+def test_hive_write_behind_logs_before_flushing_and_recovers_unflushed_sets(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_v8, 'HIVE_WRITE_BEHIND', True)
+    monkeypatch.setattr(main_v8, 'HIVE_WRITE_BEHIND_MAX_PENDING', 1)
+    monkeypatch.setattr(main_v8, 'HIVE_RECOVERED', False)
+    monkeypatch.setattr(main_v8, 'HIVE_PENDING', {})
+    monkeypatch.setattr(main_v8, 'KEY_FILTER', False)
+    flushed = []
+
+    def set_many_hive(updates):
+        # The flush only ever sees SETs that are already in the log
+        logged = {main_v8.parse_set_line(line.strip())[1] for line in open(main_v8.HIVE_LOG)}
+        assert set(updates) <= logged
+        flushed.append(dict(updates))
+        return set(updates)
+
+    monkeypatch.setattr(main_v8, 'set_many_hive', set_many_hive)
+    main_v8.set_many('Hive', [(('SID00001', 'CSE001'), 'A')], quiet=True)
+    assert [list(updates) for updates in flushed] == [[('SID00001', 'CSE001')]]
+    assert not main_v8.HIVE_PENDING
+
+    # A SET queued by a process that exited before flushing it
+    version = main_v8.next_origin_seq('Hive')
+    main_v8.complete_log_operation(main_v8.HIVE_LOG, 'SET', 'SID00002', 'CSE001', datetime.now(), 'B', ('Hive', version))
+    main_v8.append_hive_pending({('SID00002', 'CSE001'): ('B', version)})
+    monkeypatch.setattr(main_v8, 'HIVE_RECOVERED', False)
+    assert main_v8.flush_hive_writes() == 1
+    assert flushed[-1] == {('SID00002', 'CSE001'): ('B', version)}
+
+    # Once flushed, the next process has nothing to recover
+    monkeypatch.setattr(main_v8, 'HIVE_RECOVERED', False)
+    assert main_v8.flush_hive_writes() == 0
+    assert len(flushed) == 2
+
+
+def test_hive_sets_written_synchronously_are_not_recovered(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_v8, 'HIVE_RECOVERED', False)
+    monkeypatch.setattr(main_v8, 'HIVE_PENDING', {})
+    main_v8.save_hive_flushed_offset(0)
+    version = main_v8.next_origin_seq('Hive')
+    main_v8.complete_log_operation(main_v8.HIVE_LOG, 'SET', 'SID00001', 'CSE001', datetime.now(), 'A', ('Hive', version))
+    monkeypatch.setattr(main_v8, 'set_many_hive', lambda updates: pytest.fail('nothing should be flushed'))
+
+    # Without write-behind there is no recovery at all
+    monkeypatch.setattr(main_v8, 'HIVE_WRITE_BEHIND', False)
+    assert main_v8.flush_hive_writes() == 0
+    assert not main_v8.HIVE_RECOVERED
+
+    # With it, only SETs that were queued are recovered
+    monkeypatch.setattr(main_v8, 'HIVE_WRITE_BEHIND', True)
+    assert main_v8.flush_hive_writes() == 0
+    assert not main_v8.HIVE_PENDING
+
+
+def test_compile_test_line_dispatches_on_the_operation_token():
+    assert main_v8.compile_test_line('SQL . GET ( SIDSYNC1 , CSE016 )') == ('GET', 'MySQL', ('SIDSYNC1', 'CSE016'))
+    assert main_v8.compile_test_line('HIVE . SET (( SIDMERGE1 , CSE004 ) , C )') == ('SET', 'Hive', ('SIDMERGE1', 'CSE004', 'C'))
+    assert main_v8.compile_test_line('HIVE . SYNC ( SQL )') == ('SYNC', 'Hive', ('MySQL',))
+
+
+def test_set_runs_end_at_a_repeated_key(monkeypatch, tmp_path):
+    test_case = tmp_path / 'testcase.in'
+    test_case.write_text('SQL . SET (( SID1 , CSE1 ) , A )\n'
+                         'SQL . SET (( SID2 , CSE1 ) , B )\n'
+                         'SQL . SET (( SID1 , CSE1 ) , C )\n')
+    calls = []
+
+    def set_many(system, updates, quiet=False):
+        calls.append(updates)
+        return {key: True for key, grade in updates}
+
+    monkeypatch.setattr(main_v8, 'set_many', set_many)
+    monkeypatch.setattr(main_v8, 'set_mysql', lambda student_id, course_id, grade: calls.append((student_id, course_id, grade)))
+    main_v8.run_test_case(str(test_case))
+    assert calls == [[(('SID1', 'CSE1'), 'A'), (('SID2', 'CSE1'), 'B')], ('SID1', 'CSE1', 'C')]
+
+
+def test_merge_applies_a_lower_origin_seq_logged_after_a_higher_one(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    lower, higher = main_v8.next_origin_seqs('MongoDB', 2)
+    # The writer holding the higher sequence number finished first and was merged
+    main_v8.complete_log_operation(main_v8.MONGO_LOG, 'SET', 'SID00002', 'CSE001', datetime(2025, 1, 1), 'B', ('MongoDB', higher))
+    updates, checkpoints = main_v8.load_merge_updates('MySQL', ['MongoDB'])
+    main_v8.log_merge_operations(checkpoints)
+
+    main_v8.complete_log_operation(main_v8.MONGO_LOG, 'SET', 'SID00001', 'CSE001', datetime(2025, 1, 1), 'A', ('MongoDB', lower))
+    updates, checkpoints = main_v8.load_merge_updates('MySQL', ['MongoDB'])
+    assert [key for key, value in updates] == [('SID00001', 'CSE001')]
+
+
+def test_get_many_serves_hive_keys_from_the_snapshot(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_v8, 'HIVE_SNAPSHOT', True)
+    monkeypatch.setattr(main_v8, 'KEY_FILTER', False)
+    monkeypatch.setattr(main_v8, 'GET_CACHE_SIZE', 0)
+    row = {'student_id': 'SID00001', 'course_id': 'CSE001', 'roll_no': 'R1', 'email_id': 'r1@university.edu', 'grade': 'A'}
+    monkeypatch.setattr(main_v8, 'snapshot_get_many_hive', lambda keys: {('SID00001', 'CSE001'): row})
+    queried = []
+    monkeypatch.setitem(main_v8.GET_MANY, 'Hive', lambda keys: queried.append(keys) or {})
+    rows = main_v8.get_many('Hive', [('SID00001', 'CSE001'), ('SID00002', 'CSE001')], quiet=True)
+    assert rows == {('SID00001', 'CSE001'): row}
+    # The snapshot is current, so the key it lacks is not in Hive either
+    assert queried == []
+
+
+def test_write_index_drops_keys_every_system_has_at_the_same_version(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_v8, 'WRITE_INDEX', {system: {'offset': 0, 'versions': {}} for system in main_v8.LOG_MAP})
+    monkeypatch.setattr(main_v8, 'WRITE_INDEX_MAX_KEYS', 2)
+    monkeypatch.setattr(main_v8, 'WRITE_INDEX_PRUNE_AT', 2)
+    version = main_v8.next_origin_seq('MongoDB')
+    for log_file in main_v8.LOG_MAP.values():
+        main_v8.complete_log_operation(log_file, 'SET', 'SID00001', 'CSE001', datetime(2025, 1, 1), 'A', ('MongoDB', version))
+    newer = main_v8.next_origin_seq('MySQL')
+    main_v8.complete_log_operation(main_v8.MYSQL_LOG, 'SET', 'SID00002', 'CSE001', datetime(2025, 1, 1), 'B', ('MySQL', newer))
+
+    assert main_v8.fresh_systems(('SID00002', 'CSE001')) == ['MySQL']
+    assert all(('SID00001', 'CSE001') not in index['versions'] for index in main_v8.WRITE_INDEX.values())
+    assert main_v8.fresh_systems(('SID00001', 'CSE001')) == list(main_v8.LOG_MAP)
+
+
+def test_hedged_get_prints_and_logs_only_the_winning_read(monkeypatch, tmp_path, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_v8, 'KEY_FILTER', False)
+    monkeypatch.setattr(main_v8, 'GET_CACHE_SIZE', 0)
+    monkeypatch.setattr(main_v8, 'GET_LATENCIES', {system: main_v8.deque(maxlen=10) for system in main_v8.LOG_MAP})
+    monkeypatch.setattr(main_v8, 'GET_LATENCY_PRIORS', {'MongoDB': 0.01, 'MySQL': 0.02, 'Hive': 2.0})
+    release = threading.Event()
+    row = {'student_id': 'SID00001', 'course_id': 'CSE001', 'grade': 'A'}
+
+    def slow_fetch(student_id, course_id):
+        release.wait(timeout=5)
+        return {'student-ID': student_id, 'course-id': course_id, 'grade': 'A'}
+
+    monkeypatch.setitem(main_v8.FETCH_ROW, 'MongoDB', slow_fetch)
+    monkeypatch.setitem(main_v8.FETCH_ROW, 'MySQL', lambda student_id, course_id: row)
+    try:
+        assert main_v8.hedged_get('SID00001', 'CSE001') == ('MySQL', row)
+    finally:
+        release.set()
+    assert capsys.readouterr().out.count('Result:') == 1
+    assert not (tmp_path / main_v8.MONGO_LOG).exists()
+    assert open(main_v8.MYSQL_LOG).read().count('GET (SID00001, CSE001)') == 1
+
+
+def test_origin_seqs_from_different_backends_follow_issue_order(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    # Both SETs are issued within the same millisecond
+    monkeypatch.setattr(main_v8.time, 'time', lambda: 1735689600.0)
+    hive = main_v8.next_origin_seq('Hive')
+    mysql = main_v8.next_origin_seq('MySQL')
+    assert mysql > hive
+    # A batch on one backend moves every backend's clock past it
+    batch = main_v8.next_origin_seqs('MongoDB', 5)
+    assert main_v8.next_origin_seq('Hive') > batch[-1]
+
+
+def test_digest_walk_pulls_only_divergent_subtrees(monkeypatch):
+    rows = {bucket: (1, bucket) for bucket in range(main_v8.DIGEST_BUCKETS)}
+    diverged = dict(rows)
+    diverged[100] = (1, 999)
+    pulls = []
+
+    def node_function(buckets):
+        def digest_nodes(depth, parents=None):
+            pulls.append(depth)
+            nodes = {}
+            for bucket, (count, crc_sum) in buckets.items():
+                node = bucket // main_v8.DIGEST_FANOUT ** depth
+                if parents is None or node // main_v8.DIGEST_FANOUT in parents:
+                    total = nodes.get(node, (0, 0))
+                    nodes[node] = (total[0] + count, total[1] + crc_sum)
+            return nodes
+        return digest_nodes
+
+    monkeypatch.setitem(main_v8.DIGEST_NODE_FUNCTIONS, 'MySQL', node_function(rows))
+    monkeypatch.setitem(main_v8.DIGEST_NODE_FUNCTIONS, 'Hive', node_function(diverged))
+    buckets, pulled_bytes = main_v8.diff_digest_trees('MySQL', 'Hive')
+    assert buckets == [100]
+    # The root, then one divergent node's children per level
+    assert pulled_bytes == main_v8.DIGEST_NODE_BYTES * 2 * (1 + 3 * main_v8.DIGEST_FANOUT)
+
+    pulls.clear()
+    monkeypatch.setitem(main_v8.DIGEST_NODE_FUNCTIONS, 'Hive', node_function(rows))
+    assert main_v8.diff_digest_trees('MySQL', 'Hive') == ([], main_v8.DIGEST_NODE_BYTES * 2)
+    assert len(pulls) == 2
+
+
+def test_merge_all_finishes_a_leftover_journal_before_reading_checkpoints(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_v8, 'MERGE_JOURNAL', True)
+    applied = {system: [] for system in main_v8.LOG_MAP}
+
+    def apply_updates(system, updates):
+        keys = [key for key, value in updates]
+        applied[system].extend(keys)
+        return len(keys), 0, 0
+
+    for system in main_v8.LOG_MAP:
+        monkeypatch.setitem(main_v8.APPLY_UPDATES, system, lambda updates, system=system: apply_updates(system, updates))
+    seq, = main_v8.next_origin_seqs('MongoDB', 1)
+    main_v8.complete_log_operation(main_v8.MONGO_LOG, 'SET', 'SID00001', 'CSE001', datetime(2025, 1, 1), 'A', ('MongoDB', seq))
+    # An interrupted merge into MySQL from before the SET was logged
+    main_v8.write_merge_journal(main_v8.MERGE_JOURNAL_FILE.format('MySQL'), 'MySQL', ['MongoDB'], [],
+                                [('MySQL', 'MongoDB', 0, 0, None)])
+
+    main_v8.merge_all()
+    assert not any(os.path.exists(main_v8.MERGE_JOURNAL_FILE.format(system)) for system in main_v8.LOG_MAP)
+    assert applied['MySQL'] == [('SID00001', 'CSE001')]
+    assert main_v8.read_merge_checkpoint('MySQL', 'MongoDB') == (0, 1, seq)
+
+
+def test_mysql_connection_is_returned_to_the_pool_when_its_rollback_fails():
+    class Connection:
+        in_transaction = True
+        closed = False
+
+        def rollback(self):
+            raise RuntimeError('connection lost')
+
+        def close(self):
+            self.closed = True
+
+    conn = Connection()
+    main_v8.close_mysql_connection(conn)
+    assert conn.closed
+
+
+def test_failed_get_run_reports_the_error_under_each_line(monkeypatch, tmp_path, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_v8, 'KEY_FILTER', False)
+    monkeypatch.setattr(main_v8, 'GET_CACHE_SIZE', 0)
+
+    def unavailable(*args):
+        raise RuntimeError('server unavailable')
+
+    monkeypatch.setitem(main_v8.GET_MANY, 'MySQL', unavailable)
+    monkeypatch.setattr(main_v8, 'fetch_row_mysql', unavailable)
+    test_case = tmp_path / 'testcase.in'
+    test_case.write_text('SQL . GET ( SID1 , CSE1 )\n'
+                         'SQL . GET ( SID2 , CSE1 )\n')
+    main_v8.run_test_case(str(test_case))
+    output = capsys.readouterr().out
+    assert 'No record found' not in output
+    blocks = output.split('--- Processing command: ')[1:]
+    assert len(blocks) == 2
+    assert all('MySQL Error: server unavailable' in block for block in blocks)